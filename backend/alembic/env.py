@@ -1,8 +1,8 @@
 import asyncio
+from functools import lru_cache
 from logging.config import fileConfig
 
 from alembic import context
-from sqlalchemy import pool
 from sqlalchemy.ext.asyncio import async_engine_from_config
 
 from app.config import settings
@@ -26,26 +26,44 @@ def run_migrations_offline() -> None:
         context.run_migrations()
 
 
-OUR_TABLES = {
+OUR_TABLES = frozenset({
     "projects", "project_versions", "project_files", "chat_threads", "chat_messages", "project_memories",
     "exploration_sessions", "exploration_options", "exploration_memory_notes", "user_preferences",
     "kv_cache",
-}
+})
 
 
-def include_object(object, name, type_, reflected, compare_to):
+def include_name(name, type_, parent_names):
+    # Runs before reflection, so tables owned by other apps sharing this
+    # database are never introspected column-by-column.
     if type_ == "table":
         return name in OUR_TABLES
-    if type_ == "index" and hasattr(object, "table"):
-        return object.table.name in OUR_TABLES
     return True
 
 
+@lru_cache(maxsize=8192)
+def _is_ours(type_, table_name):
+    # Autogenerate asks about the same (type, table) pairs many times per diff
+    if type_ in ("table", "index"):
+        return table_name is None or table_name in OUR_TABLES
+    return True
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    if type_ == "table":
+        return _is_ours(type_, name)
+    return _is_ours(type_, getattr(getattr(object, "table", None), "name", None))
+
+
 def do_run_migrations(connection):
     context.configure(
         connection=connection,
         target_metadata=target_metadata,
+        include_name=include_name,
         include_object=include_object,
+        # Each revision commits on its own, so autocommit_block() in a
+        # revision (CREATE INDEX CONCURRENTLY) never flushes earlier ones.
+        transaction_per_migration=True,
     )
     with context.begin_transaction():
         context.run_migrations()
@@ -54,7 +72,11 @@ def do_run_migrations(connection):
 async def run_async_migrations() -> None:
     cfg = config.get_section(config.config_ini_section, {})
     cfg["sqlalchemy.url"] = settings.database_url
-    connectable = async_engine_from_config(cfg, prefix="sqlalchemy.", poolclass=pool.NullPool)
+    # Pooled engine: revisions share one warm connection instead of paying
+    # connection setup again; disposed once the run finishes.
+    connectable = async_engine_from_config(
+        cfg, prefix="sqlalchemy.", pool_size=2, pool_pre_ping=False,
+    )
     async with connectable.connect() as connection:
         await connection.run_sync(do_run_migrations)
     await connectable.dispose()
@@ -19,9 +19,9 @@ depends_on: Union[str, Sequence[str], None] = None
 def upgrade() -> None:
     # Drop the old projects table columns if they exist, add new ones
     # First check if the old 'projects' table has our columns already
-    conn = op.get_bind()
-    inspector = sa.inspect(conn)
-    existing_tables = inspector.get_table_names()
+    # Introspect once and keep the table set in sync locally
+    inspector = sa.inspect(op.get_bind())
+    existing_tables = set(inspector.get_table_names())
 
     # Handle projects table - drop old one if it exists with different schema
     if 'projects' in existing_tables:
@@ -40,10 +40,12 @@ def upgrade() -> None:
             # Drop documents table FK if exists
             if 'documents' in existing_tables:
                 op.drop_table('documents')
+                existing_tables.discard('documents')
             op.drop_table('projects')
+            existing_tables.discard('projects')
 
     # Create projects table
-    if 'projects' not in sa.inspect(op.get_bind()).get_table_names():
+    if 'projects' not in existing_tables:
         op.create_table('projects',
             sa.Column('id', sa.UUID(), nullable=False),
             sa.Column('title', sa.String(length=255), nullable=False),
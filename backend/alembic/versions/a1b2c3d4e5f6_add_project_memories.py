@@ -19,7 +19,7 @@ def upgrade() -> None:
     op.execute("CREATE EXTENSION IF NOT EXISTS vector")
 
     op.execute("""
-        CREATE TABLE project_memories (
+        CREATE TABLE IF NOT EXISTS project_memories (
             id SERIAL PRIMARY KEY,
             project_id UUID NOT NULL REFERENCES projects(id) ON DELETE CASCADE,
             content TEXT NOT NULL,
@@ -31,7 +31,7 @@ def upgrade() -> None:
     """)
 
     op.execute(
-        "CREATE INDEX ix_project_memories_embedding ON project_memories "
+        "CREATE INDEX IF NOT EXISTS ix_project_memories_embedding ON project_memories "
         "USING hnsw (embedding vector_cosine_ops)"
     )
 
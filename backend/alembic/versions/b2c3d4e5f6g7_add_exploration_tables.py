@@ -33,6 +33,7 @@ def upgrade() -> None:
         sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
         sa.PrimaryKeyConstraint('id'),
         sa.ForeignKeyConstraint(['project_id'], ['projects.id'], ondelete='CASCADE'),
+        if_not_exists=True,
     )
 
     # Exploration options
@@ -53,6 +54,7 @@ def upgrade() -> None:
         sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
         sa.PrimaryKeyConstraint('id'),
         sa.ForeignKeyConstraint(['session_id'], ['exploration_sessions.id'], ondelete='CASCADE'),
+        if_not_exists=True,
     )
 
     # Exploration memory notes
@@ -69,6 +71,7 @@ def upgrade() -> None:
         sa.PrimaryKeyConstraint('id'),
         sa.ForeignKeyConstraint(['project_id'], ['projects.id'], ondelete='CASCADE'),
         sa.ForeignKeyConstraint(['source_session_id'], ['exploration_sessions.id'], ondelete='SET NULL'),
+        if_not_exists=True,
     )
 
     # User preferences
@@ -80,6 +83,7 @@ def upgrade() -> None:
         sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
         sa.PrimaryKeyConstraint('id'),
         sa.ForeignKeyConstraint(['project_id'], ['projects.id'], ondelete='CASCADE'),
+        if_not_exists=True,
     )
 
 
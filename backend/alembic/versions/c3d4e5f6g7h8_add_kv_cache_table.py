@@ -27,8 +27,9 @@ def upgrade() -> None:
         sa.Column('expires_at', sa.DateTime(timezone=True), nullable=True),
         sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
         sa.PrimaryKeyConstraint('id'),
+        if_not_exists=True,
     )
-    op.create_index('ix_kv_cache_cache_key', 'kv_cache', ['cache_key'], unique=True)
+    op.create_index('ix_kv_cache_cache_key', 'kv_cache', ['cache_key'], unique=True, if_not_exists=True)
 
 
 def downgrade() -> None:
@@ -0,0 +1,60 @@
+"""add foreign key indexes
+
+Revision ID: d4e5f6g7h8i9
+Revises: c3d4e5f6g7h8
+Create Date: 2026-10-16 10:00:00.000000
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4e5f6g7h8i9'
+down_revision: Union[str, None] = 'c3d4e5f6g7h8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (index name, table, column) for every FK column that had no index
+FK_INDEXES = [
+    ('ix_chat_messages_thread_id', 'chat_messages', 'thread_id'),
+    ('ix_project_versions_project_id', 'project_versions', 'project_id'),
+    ('ix_project_versions_source_message_id', 'project_versions', 'source_message_id'),
+    ('ix_projects_current_version_id', 'projects', 'current_version_id'),
+    ('ix_projects_published_version_id', 'projects', 'published_version_id'),
+    ('ix_project_files_version_id', 'project_files', 'version_id'),
+    ('ix_project_memories_project_id', 'project_memories', 'project_id'),
+    ('ix_exploration_sessions_project_id', 'exploration_sessions', 'project_id'),
+    ('ix_exploration_options_session_id', 'exploration_options', 'session_id'),
+    ('ix_exploration_memory_notes_project_id', 'exploration_memory_notes', 'project_id'),
+    ('ix_exploration_memory_notes_source_session_id', 'exploration_memory_notes', 'source_session_id'),
+    ('ix_user_preferences_project_id', 'user_preferences', 'project_id'),
+]
+
+
+def upgrade() -> None:
+    # CONCURRENTLY cannot run inside a transaction; build without blocking writes
+    with op.get_context().autocommit_block():
+        for name, table, column in FK_INDEXES:
+            op.create_index(
+                name, table, [column],
+                postgresql_concurrently=True, if_not_exists=True,
+            )
+
+        # TTL sweeps only care about rows that can expire
+        op.create_index(
+            'ix_kv_cache_expires_at', 'kv_cache', ['expires_at'],
+            postgresql_where=sa.text('expires_at IS NOT NULL'),
+            postgresql_concurrently=True, if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_kv_cache_expires_at', table_name='kv_cache',
+            postgresql_concurrently=True, if_exists=True,
+        )
+        for name, table, _ in reversed(FK_INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,63 @@
+"""store memory embeddings as halfvec with tuned hnsw index
+
+Revision ID: e5f6g7h8i9j0
+Revises: d4e5f6g7h8i9
+Create Date: 2026-10-16 11:00:00.000000
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5f6g7h8i9j0'
+down_revision: Union[str, None] = 'd4e5f6g7h8i9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# First pgvector release with the halfvec type
+_MIN_VECTOR_VERSION = (0, 7, 0)
+
+
+def _check_vector_version() -> None:
+    # Upgrading the extension needs its owner or a superuser, so that is left
+    # to the DBA; stop here with a clear message instead of failing mid-way
+    version = op.get_bind().execute(
+        sa.text("SELECT extversion FROM pg_extension WHERE extname = 'vector'")
+    ).scalar()
+    if version is None:
+        raise RuntimeError("pgvector extension is not installed")
+    parts = tuple(int(p) for p in version.split(".") if p.isdigit())
+    if parts < _MIN_VECTOR_VERSION:
+        raise RuntimeError(
+            f"halfvec needs pgvector >= 0.7.0, found {version}; "
+            "run ALTER EXTENSION vector UPDATE as the extension owner first"
+        )
+
+
+def upgrade() -> None:
+    _check_vector_version()
+    op.execute("DROP INDEX IF EXISTS ix_project_memories_embedding")
+    op.execute(
+        "ALTER TABLE project_memories "
+        "ALTER COLUMN embedding TYPE halfvec(1536) USING embedding::halfvec(1536)"
+    )
+    # Build the HNSW graph without holding a write lock on the table
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_project_memories_embedding ON project_memories "
+            "USING hnsw (embedding halfvec_cosine_ops) WITH (m = 16, ef_construction = 64)"
+        )
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS ix_project_memories_embedding")
+    op.execute(
+        "ALTER TABLE project_memories "
+        "ALTER COLUMN embedding TYPE vector(1536) USING embedding::vector(1536)"
+    )
+    op.execute(
+        "CREATE INDEX ix_project_memories_embedding ON project_memories "
+        "USING hnsw (embedding vector_cosine_ops)"
+    )
@@ -0,0 +1,40 @@
+"""index chat_messages by thread and creation time
+
+Revision ID: f6g7h8i9j0k1
+Revises: e5f6g7h8i9j0
+Create Date: 2026-10-16 12:00:00.000000
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'f6g7h8i9j0k1'
+down_revision: Union[str, None] = 'e5f6g7h8i9j0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_chat_messages_thread_created', 'chat_messages', ['thread_id', 'created_at'],
+            postgresql_concurrently=True, if_not_exists=True,
+        )
+        # The compound index serves thread_id lookups and FK cascades too
+        op.drop_index(
+            'ix_chat_messages_thread_id', table_name='chat_messages',
+            postgresql_concurrently=True, if_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_chat_messages_thread_id', 'chat_messages', ['thread_id'],
+            postgresql_concurrently=True, if_not_exists=True,
+        )
+        op.drop_index(
+            'ix_chat_messages_thread_created', table_name='chat_messages',
+            postgresql_concurrently=True, if_exists=True,
+        )
@@ -0,0 +1,39 @@
+"""cover kv_cache expiry in the cache_key index
+
+Revision ID: g7h8i9j0k1l2
+Revises: f6g7h8i9j0k1
+Create Date: 2026-10-16 13:00:00.000000
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'g7h8i9j0k1l2'
+down_revision: Union[str, None] = 'f6g7h8i9j0k1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _swap_cache_key_index(**kw) -> None:
+    # Build the replacement first so cache_key stays unique throughout
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_kv_cache_cache_key_new', 'kv_cache', ['cache_key'],
+            unique=True, postgresql_concurrently=True, if_not_exists=True, **kw,
+        )
+        op.drop_index(
+            'ix_kv_cache_cache_key', table_name='kv_cache',
+            postgresql_concurrently=True, if_exists=True,
+        )
+    op.execute('ALTER INDEX ix_kv_cache_cache_key_new RENAME TO ix_kv_cache_cache_key')
+
+
+def upgrade() -> None:
+    # value_text holds whole preview pages, which overflow the btree tuple
+    # limit, so only expires_at is carried in the index.
+    _swap_cache_key_index(postgresql_include=['expires_at'])
+
+
+def downgrade() -> None:
+    _swap_cache_key_index()
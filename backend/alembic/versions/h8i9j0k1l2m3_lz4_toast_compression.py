@@ -0,0 +1,50 @@
+"""use lz4 toast compression for large jsonb/text columns
+
+Revision ID: h8i9j0k1l2m3
+Revises: g7h8i9j0k1l2
+Create Date: 2026-10-16 14:00:00.000000
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'h8i9j0k1l2m3'
+down_revision: Union[str, None] = 'g7h8i9j0k1l2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+COMPRESSED_COLUMNS = [
+    ('exploration_sessions', 'hypothesis_ledger'),
+    ('exploration_options', 'mechanics'),
+    ('exploration_options', 'assumptions_to_validate'),
+    ('exploration_memory_notes', 'content_json'),
+    ('user_preferences', 'preference_json'),
+    ('kv_cache', 'value_text'),
+]
+
+
+def _lz4_available() -> bool:
+    # Requires PostgreSQL 14+ built with lz4
+    return bool(op.get_bind().execute(sa.text(
+        "SELECT 'lz4' = ANY(enumvals) FROM pg_settings "
+        "WHERE name = 'default_toast_compression'"
+    )).scalar())
+
+
+def upgrade() -> None:
+    if not _lz4_available():
+        return
+    # Only newly written values are compressed with lz4; existing ones
+    # keep pglz until they are rewritten.
+    for table, column in COMPRESSED_COLUMNS:
+        op.execute(f"ALTER TABLE {table} ALTER COLUMN {column} SET COMPRESSION lz4")
+
+
+def downgrade() -> None:
+    if not _lz4_available():
+        return
+    for table, column in COMPRESSED_COLUMNS:
+        op.execute(f"ALTER TABLE {table} ALTER COLUMN {column} SET COMPRESSION default")
@@ -0,0 +1,41 @@
+"""store file and chat message content as bytea
+
+Revision ID: j0k1l2m3n4o5
+Revises: i9j0k1l2m3n4
+Create Date: 2026-10-16 16:00:00.000000
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'j0k1l2m3n4o5'
+down_revision: Union[str, None] = 'i9j0k1l2m3n4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+CONTENT_COLUMNS = [('project_files', 'content'), ('chat_messages', 'content')]
+
+
+def upgrade() -> None:
+    # Existing rows become plain UTF-8 bytes; the application compresses
+    # new values itself (app.db.types.CompressedText) and reads both forms.
+    for table, column in CONTENT_COLUMNS:
+        op.execute(
+            f"ALTER TABLE {table} ALTER COLUMN {column} TYPE bytea "
+            f"USING convert_to({column}, 'UTF8')"
+        )
+        # Values are already zstd-compressed; skip a second pglz/lz4 pass
+        op.execute(f"ALTER TABLE {table} ALTER COLUMN {column} SET STORAGE EXTERNAL")
+
+
+def downgrade() -> None:
+    # Compressed rows cannot be decoded in SQL; run this only after the
+    # application has rewritten them uncompressed.
+    for table, column in CONTENT_COLUMNS:
+        op.execute(f"ALTER TABLE {table} ALTER COLUMN {column} SET STORAGE EXTENDED")
+        op.execute(
+            f"ALTER TABLE {table} ALTER COLUMN {column} TYPE text "
+            f"USING convert_from({column}, 'UTF8')"
+        )
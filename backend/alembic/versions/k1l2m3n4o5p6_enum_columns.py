@@ -0,0 +1,54 @@
+"""convert low-cardinality string columns to enums
+
+Revision ID: k1l2m3n4o5p6
+Revises: j0k1l2m3n4o5
+Create Date: 2026-10-16 17:00:00.000000
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'k1l2m3n4o5p6'
+down_revision: Union[str, None] = 'j0k1l2m3n4o5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (table, column, enum name, values, fallback for unknown values, original varchar length)
+ENUM_COLUMNS = [
+    ('chat_messages', 'role', 'chat_role',
+     ('user', 'assistant', 'system', 'tool'), 'assistant', 20),
+    ('exploration_options', 'complexity', 'option_complexity',
+     ('low', 'medium', 'high'), 'medium', 20),
+    ('exploration_options', 'mobile_fit', 'option_mobile_fit',
+     ('good', 'fair', 'poor'), 'good', 20),
+    ('project_files', 'file_type', 'project_file_type',
+     ('text/html', 'text/css', 'application/javascript', 'application/json', 'image/svg+xml',
+      'image/png', 'image/jpeg', 'image/gif', 'image/x-icon', 'text/plain'), 'text/plain', 50),
+]
+
+
+def _sql_list(values) -> str:
+    return ", ".join(f"'{v}'" for v in values)
+
+
+def upgrade() -> None:
+    for table, column, enum_name, values, fallback, _ in ENUM_COLUMNS:
+        op.execute(f"CREATE TYPE {enum_name} AS ENUM ({_sql_list(values)})")
+        # Values written before the enum existed came straight from LLM output,
+        # so anything outside the set is mapped to the application default.
+        op.execute(
+            f"ALTER TABLE {table} ALTER COLUMN {column} TYPE {enum_name} USING ("
+            f"CASE WHEN lower({column}) IN ({_sql_list(values)}) THEN lower({column}) "
+            f"ELSE '{fallback}' END)::{enum_name}"
+        )
+
+
+def downgrade() -> None:
+    for table, column, enum_name, _, _, length in reversed(ENUM_COLUMNS):
+        op.execute(
+            f"ALTER TABLE {table} ALTER COLUMN {column} TYPE varchar({length}) "
+            f"USING {column}::text"
+        )
+        op.execute(f"DROP TYPE IF EXISTS {enum_name}")
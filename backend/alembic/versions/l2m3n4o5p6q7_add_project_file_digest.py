@@ -0,0 +1,36 @@
+"""add content hash and token count to project files
+
+Revision ID: l2m3n4o5p6q7
+Revises: k1l2m3n4o5p6
+Create Date: 2026-10-16 18:00:00.000000
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'l2m3n4o5p6q7'
+down_revision: Union[str, None] = 'k1l2m3n4o5p6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('project_files', sa.Column('content_sha256', sa.String(64), nullable=True))
+    op.add_column('project_files', sa.Column('token_count', sa.Integer(), nullable=True))
+
+    # Small files are stored as plain UTF-8 and can be backfilled in SQL.
+    # zstd-compressed rows stay NULL; readers estimate on the fly until the
+    # next version rewrites them.
+    op.execute(
+        "UPDATE project_files SET "
+        "content_sha256 = encode(sha256(content), 'hex'), "
+        "token_count = (char_length(convert_from(content, 'UTF8')) + 3) / 4 "
+        "WHERE substring(content FROM 1 FOR 4) <> '\\x28b52ffd'::bytea"
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('project_files', 'token_count')
+    op.drop_column('project_files', 'content_sha256')
@@ -0,0 +1,41 @@
+"""index exploration_options by session and option id
+
+Revision ID: m3n4o5p6q7r8
+Revises: l2m3n4o5p6q7
+Create Date: 2026-10-16 19:00:00.000000
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'm3n4o5p6q7r8'
+down_revision: Union[str, None] = 'l2m3n4o5p6q7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_exploration_options_session_option', 'exploration_options',
+            ['session_id', 'option_id'],
+            postgresql_concurrently=True, if_not_exists=True,
+        )
+        # The compound index serves session_id lookups and FK cascades too
+        op.drop_index(
+            'ix_exploration_options_session_id', table_name='exploration_options',
+            postgresql_concurrently=True, if_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_exploration_options_session_id', 'exploration_options', ['session_id'],
+            postgresql_concurrently=True, if_not_exists=True,
+        )
+        op.drop_index(
+            'ix_exploration_options_session_option', table_name='exploration_options',
+            postgresql_concurrently=True, if_exists=True,
+        )
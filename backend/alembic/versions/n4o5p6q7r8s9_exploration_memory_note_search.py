@@ -0,0 +1,42 @@
+"""full-text search column on exploration_memory_notes
+
+Revision ID: n4o5p6q7r8s9
+Revises: m3n4o5p6q7r8
+Create Date: 2026-10-16 20:00:00.000000
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects.postgresql import TSVECTOR
+
+# revision identifiers, used by Alembic.
+revision: str = 'n4o5p6q7r8s9'
+down_revision: Union[str, None] = 'm3n4o5p6q7r8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        'exploration_memory_notes',
+        sa.Column(
+            'search_tsv', TSVECTOR(),
+            sa.Computed("""jsonb_to_tsvector('english', content_json, '["string"]')""", persisted=True),
+            nullable=True,
+        ),
+    )
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_exploration_memory_notes_search_tsv', 'exploration_memory_notes', ['search_tsv'],
+            postgresql_using='gin', postgresql_concurrently=True, if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_exploration_memory_notes_search_tsv', table_name='exploration_memory_notes',
+            postgresql_concurrently=True, if_exists=True,
+        )
+    op.drop_column('exploration_memory_notes', 'search_tsv')
@@ -1,3 +1,4 @@
+from pydantic import PrivateAttr
 from pydantic_settings import BaseSettings
 
 
@@ -7,21 +8,55 @@ _MAX_COMPLETION_TOKENS_MODELS = {"gpt-5.2", "gpt-5", "o1", "o3", "o3-mini", "o1-
 
 class Settings(BaseSettings):
     database_url: str = "postgresql+asyncpg://liuli@192.168.0.151:5432/postgres"
+    db_pool_size: int = 20
+    db_max_overflow: int = 40
     openai_api_key: str = ""
     openai_base_url: str | None = None
     openai_model: str = "gpt-5.2"
+    # Smaller model for the intent parser and planner (short JSON outputs)
+    openai_model_classify: str = "gpt-4o-mini"
     openai_embedding_model: str = "text-embedding-3-small"
+    openai_max_concurrent_requests: int = 16
+    openai_rpm: int = 500  # 0 disables the limit
+    openai_tpm: int = 200_000  # 0 disables the limit
+    openai_max_retries: int = 3
+    openai_timeout_seconds: float = 600.0  # read timeout; long generations stream
     memory_max_injected_chars: int = 4000
+    memory_hnsw_ef_search: int = 40
+    intent_cache_ttl: int = 1800
+    kv_cache_purge_interval_seconds: int = 600
+    # Exact-match cache for exploration Stage D/E responses, stored in kv_cache
+    llm_cache_enabled: bool = True
+    llm_cache_ttl: int = 86400
+    sse_coalesce_ms: int = 30  # 0 sends every streamed token as its own event
+    openai_debug_log_size: int = 50  # 0 turns off the /debug/openai_log buffer
     app_env: str = "development"
     cors_origins: str = "http://localhost:5173"
 
     model_config = {"env_file": ".env", "env_file_encoding": "utf-8"}
 
-    def max_tokens_param(self, n: int) -> dict:
-        """Return the right max-tokens kwarg for the current model."""
+    _max_tokens_key: str = PrivateAttr(default="max_tokens")
+    _max_tokens_key_classify: str = PrivateAttr(default="max_tokens")
+    _cors_origin_set: frozenset[str] = PrivateAttr(default=frozenset())
+
+    def model_post_init(self, __context) -> None:
+        # The model is fixed for the process, so resolve the kwarg name once
         if self.openai_model in _MAX_COMPLETION_TOKENS_MODELS:
-            return {"max_completion_tokens": n}
-        return {"max_tokens": n}
+            self._max_tokens_key = "max_completion_tokens"
+        if self.openai_model_classify in _MAX_COMPLETION_TOKENS_MODELS:
+            self._max_tokens_key_classify = "max_completion_tokens"
+        self._cors_origin_set = frozenset(
+            o.strip() for o in self.cors_origins.split(",") if o.strip()
+        )
+
+    @property
+    def cors_origin_set(self) -> frozenset[str]:
+        """Parsed CORS origins; a set so the per-request origin check is O(1)."""
+        return self._cors_origin_set
+
+    def max_tokens_param(self, n: int, classify: bool = False) -> dict:
+        """Return the right max-tokens kwarg for the main (or classify) model."""
+        return {self._max_tokens_key_classify if classify else self._max_tokens_key: n}
 
 
 settings = Settings()
@@ -1,6 +1,30 @@
+import orjson
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 
 from app.config import settings
 
-engine = create_async_engine(settings.database_url, echo=(settings.app_env == "development"))
+
+def _json_serializer(value) -> str:
+    # The asyncpg dialect's jsonb codec expects str, not bytes
+    return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS).decode()
+
+
+engine = create_async_engine(
+    settings.database_url,
+    echo=(settings.app_env == "development"),
+    json_serializer=_json_serializer,
+    json_deserializer=orjson.loads,
+    pool_size=settings.db_pool_size,
+    max_overflow=settings.db_max_overflow,
+    pool_pre_ping=True,
+    pool_recycle=1800,
+    # LIFO keeps a small hot set of connections busy and lets the rest idle out
+    pool_use_lifo=True,
+    connect_args={
+        # Short OLTP queries only; JIT compilation costs more than it saves
+        "server_settings": {"jit": "off"},
+        "statement_cache_size": 1024,
+        "prepared_statement_cache_size": 500,
+    },
+)
 async_session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
@@ -0,0 +1,56 @@
+from collections.abc import Iterator
+
+import zstandard
+from sqlalchemy import LargeBinary
+from sqlalchemy.types import TypeDecorator
+
+# Every zstd frame starts with this magic number. UTF-8 text can never start
+# with it (0xB5 is a continuation byte), so rows written before compression
+# was introduced are told apart without an extra flag byte.
+_ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+# Below this size compression costs more than it saves
+_MIN_COMPRESS_BYTES = 1024
+
+# Chunk size when streaming stored content out without decoding it whole
+_STREAM_CHUNK_BYTES = 64 * 1024
+
+_compressor = zstandard.ZstdCompressor(level=3)
+_decompressor = zstandard.ZstdDecompressor()
+
+
+def is_zstd(raw: bytes) -> bool:
+    return raw[:4] == _ZSTD_MAGIC
+
+
+def iter_stored_bytes(raw: bytes) -> Iterator[bytes]:
+    """Yield the UTF-8 bytes of a raw CompressedText value, decompressing in chunks."""
+    if not is_zstd(raw):
+        yield bytes(raw)
+        return
+    # Starlette drains sync generators in threadpool threads, so each stream
+    # gets its own context; the shared one is only used on the event loop
+    decompressor = zstandard.ZstdDecompressor()
+    yield from decompressor.read_to_iter(raw, write_size=_STREAM_CHUNK_BYTES)
+
+
+class CompressedText(TypeDecorator):
+    """Text stored as bytea, zstd-compressed once it is large enough to matter."""
+
+    impl = LargeBinary
+    cache_ok = True
+
+    def process_bind_param(self, value: str | None, dialect) -> bytes | None:
+        if value is None:
+            return None
+        raw = value.encode("utf-8")
+        if len(raw) < _MIN_COMPRESS_BYTES:
+            return raw
+        return _compressor.compress(raw)
+
+    def process_result_value(self, value: bytes | None, dialect) -> str | None:
+        if value is None:
+            return None
+        if value[:4] == _ZSTD_MAGIC:
+            value = _decompressor.decompress(value)
+        return bytes(value).decode("utf-8")
@@ -1,19 +1,46 @@
-from collections.abc import AsyncGenerator
+from functools import lru_cache
 
+import httpx
 from openai import AsyncOpenAI
-from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.config import settings
-from app.db.engine import async_session_factory
+from app.db.session import get_async_session
+from app.utils.llm import RateLimitedTransport
 
+# Single DB session dependency; kept under the name the routers import.
+get_db = get_async_session
 
-async def get_db() -> AsyncGenerator[AsyncSession, None]:
-    async with async_session_factory() as session:
-        yield session
 
-
-def get_openai_client() -> AsyncOpenAI:
+@lru_cache(maxsize=1)
+def openai_client() -> AsyncOpenAI:
+    """Process-wide OpenAI client so requests share one HTTP connection pool."""
     kwargs: dict = {"api_key": settings.openai_api_key}
     if settings.openai_base_url:
         kwargs["base_url"] = settings.openai_base_url
-    return AsyncOpenAI(**kwargs)
+    transport = RateLimitedTransport(
+        # HTTP/2 multiplexes concurrent pipeline calls over a few connections;
+        # idle ones are kept long enough to survive gaps between chat turns
+        httpx.AsyncHTTPTransport(
+            http2=True,
+            limits=httpx.Limits(
+                max_connections=100, max_keepalive_connections=50, keepalive_expiry=30.0
+            ),
+        ),
+        max_concurrent=settings.openai_max_concurrent_requests,
+        rpm=settings.openai_rpm,
+        tpm=settings.openai_tpm,
+    )
+    return AsyncOpenAI(
+        **kwargs,
+        # The SDK retries 429/5xx with exponential backoff and honours Retry-After
+        max_retries=settings.openai_max_retries,
+        # Non-streamed calls (tool rounds, Stage C/D) can run for minutes, so
+        # the read timeout stays long; only connecting is expected to be quick
+        timeout=httpx.Timeout(settings.openai_timeout_seconds, connect=5.0),
+        http_client=httpx.AsyncClient(transport=transport),
+    )
+
+
+async def get_openai_client() -> AsyncOpenAI:
+    # async so FastAPI resolves it inline instead of via the threadpool
+    return openai_client()
@@ -1,14 +1,66 @@
+import asyncio
+import contextlib
+import logging
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import text
 
 from app.config import settings
+from app.db.engine import engine, async_session_factory
+from app.dependencies import openai_client
 from app.routers import projects, versions, files, chat, build, preview, publish, memories, exploration
+from app.services.exploration_service import purge_expired_cache
+
+logger = logging.getLogger(__name__)
+
+
+async def _purge_kv_cache_periodically() -> None:
+    while True:
+        await asyncio.sleep(settings.kv_cache_purge_interval_seconds)
+        try:
+            async with async_session_factory() as db:
+                await purge_expired_cache(db)
+        except Exception:
+            logger.exception("kv_cache purge failed")
+
+
+async def _warm_up_pool() -> None:
+    """Open pool_size connections up front so early requests skip connect + type introspection."""
 
-app = FastAPI(title="SimplePageGenerator", version="0.1.0")
+    async def _ping() -> None:
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+
+    try:
+        await asyncio.gather(*(_ping() for _ in range(settings.db_pool_size)))
+    except Exception:
+        logger.exception("database pool warm-up failed")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await _warm_up_pool()
+    purge_task = asyncio.create_task(_purge_kv_cache_periodically())
+    yield
+    purge_task.cancel()
+    with contextlib.suppress(asyncio.CancelledError):
+        await purge_task
+    await openai_client().close()
+
+
+app = FastAPI(
+    title="SimplePageGenerator",
+    version="0.1.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
+)
 
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=settings.cors_origins.split(","),
+    allow_origins=settings.cors_origin_set,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
@@ -1,9 +1,12 @@
 from datetime import datetime
 
-from sqlalchemy import Integer, String, Text, DateTime, ForeignKey, func
+from sqlalchemy import Integer, DateTime, Enum, ForeignKey, func, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.db.base import Base
+from app.db.types import CompressedText
+
+CHAT_ROLES = ("user", "assistant", "system", "tool")
 
 
 class ChatMessage(Base):
@@ -11,8 +14,12 @@ class ChatMessage(Base):
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     thread_id: Mapped[int] = mapped_column(ForeignKey("chat_threads.id", ondelete="CASCADE"), nullable=False)
-    role: Mapped[str] = mapped_column(String(20), nullable=False)
-    content: Mapped[str] = mapped_column(Text, nullable=False, default="")
+    role: Mapped[str] = mapped_column(Enum(*CHAT_ROLES, name="chat_role"), nullable=False)
+    content: Mapped[str] = mapped_column(CompressedText, nullable=False, default="")
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
 
     thread: Mapped["ChatThread"] = relationship("ChatThread", back_populates="messages")
+
+    __table_args__ = (
+        Index("ix_chat_messages_thread_created", "thread_id", "created_at"),
+    )
@@ -15,6 +15,10 @@ class ChatThread(Base):
 
     project: Mapped["Project"] = relationship("Project", back_populates="chat_thread")
     messages: Mapped[list["ChatMessage"]] = relationship(
-        "ChatMessage", back_populates="thread", cascade="all, delete-orphan", lazy="selectin",
+        "ChatMessage",
+        back_populates="thread",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+        lazy="raise",
         order_by="ChatMessage.created_at",
     )
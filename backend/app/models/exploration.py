@@ -1,12 +1,15 @@
 import uuid
 from datetime import datetime
 
-from sqlalchemy import Integer, String, Text, DateTime, Float, ForeignKey, func, Index
-from sqlalchemy.dialects.postgresql import UUID, JSONB
+from sqlalchemy import Integer, String, Text, DateTime, Enum, Float, ForeignKey, func, Index, text, FetchedValue, Computed
+from sqlalchemy.dialects.postgresql import UUID, JSONB, TSVECTOR
 from sqlalchemy.orm import Mapped, mapped_column
 
 from app.db.base import Base
 
+OPTION_COMPLEXITIES = ("low", "medium", "high")
+OPTION_MOBILE_FITS = ("good", "fair", "poor")
+
 
 class KVCache(Base):
     __tablename__ = "kv_cache"
@@ -19,7 +22,8 @@ class KVCache(Base):
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
 
     __table_args__ = (
-        Index("ix_kv_cache_cache_key", "cache_key", unique=True),
+        Index("ix_kv_cache_cache_key", "cache_key", unique=True, postgresql_include=["expires_at"]),
+        Index("ix_kv_cache_expires_at", "expires_at", postgresql_where=text("expires_at IS NOT NULL")),
     )
 
 
@@ -28,7 +32,7 @@ class ExplorationSession(Base):
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     project_id: Mapped[uuid.UUID] = mapped_column(
-        UUID(as_uuid=True), ForeignKey("projects.id", ondelete="CASCADE"), nullable=False
+        UUID(as_uuid=True), ForeignKey("projects.id", ondelete="CASCADE"), nullable=False, index=True
     )
     user_input: Mapped[str] = mapped_column(Text, nullable=False)
     ambiguity_json: Mapped[dict] = mapped_column(JSONB, nullable=True)
@@ -40,7 +44,7 @@ class ExplorationSession(Base):
     iteration_count: Mapped[int] = mapped_column(Integer, default=0)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
     updated_at: Mapped[datetime] = mapped_column(
-        DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
+        DateTime(timezone=True), server_default=func.now(), server_onupdate=FetchedValue()
     )
 
 
@@ -57,28 +61,47 @@ class ExplorationOption(Base):
     controls: Mapped[str] = mapped_column(Text, nullable=False)
     mechanics: Mapped[dict] = mapped_column(JSONB, nullable=False)
     template_id: Mapped[str] = mapped_column(String(100), nullable=False)
-    complexity: Mapped[str] = mapped_column(String(20), nullable=False)
-    mobile_fit: Mapped[str] = mapped_column(String(20), nullable=False)
+    complexity: Mapped[str] = mapped_column(
+        Enum(*OPTION_COMPLEXITIES, name="option_complexity"), nullable=False
+    )
+    mobile_fit: Mapped[str] = mapped_column(
+        Enum(*OPTION_MOBILE_FITS, name="option_mobile_fit"), nullable=False
+    )
     assumptions_to_validate: Mapped[dict | None] = mapped_column(JSONB, nullable=True)
     is_recommended: Mapped[bool] = mapped_column(default=False)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
 
+    __table_args__ = (
+        Index("ix_exploration_options_session_option", "session_id", "option_id"),
+    )
+
 
 class ExplorationMemoryNote(Base):
     __tablename__ = "exploration_memory_notes"
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     project_id: Mapped[uuid.UUID] = mapped_column(
-        UUID(as_uuid=True), ForeignKey("projects.id", ondelete="CASCADE"), nullable=False
+        UUID(as_uuid=True), ForeignKey("projects.id", ondelete="CASCADE"), nullable=False, index=True
     )
     content_json: Mapped[dict] = mapped_column(JSONB, nullable=False)
     tags: Mapped[dict | None] = mapped_column(JSONB, nullable=True)
     confidence: Mapped[float] = mapped_column(Float, default=0.8)
     source_version_id: Mapped[int | None] = mapped_column(Integer, nullable=True)
     source_session_id: Mapped[int | None] = mapped_column(
-        Integer, ForeignKey("exploration_sessions.id", ondelete="SET NULL"), nullable=True
+        Integer, ForeignKey("exploration_sessions.id", ondelete="SET NULL"), nullable=True, index=True
     )
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    # Full-text vector over the note's string values, maintained by Postgres;
+    # only used in search_memory's WHERE clause, so never loaded
+    search_tsv = mapped_column(
+        TSVECTOR,
+        Computed("""jsonb_to_tsvector('english', content_json, '["string"]')""", persisted=True),
+        deferred=True,
+    )
+
+    __table_args__ = (
+        Index("ix_exploration_memory_notes_search_tsv", "search_tsv", postgresql_using="gin"),
+    )
 
 
 class UserPreference(Base):
@@ -86,9 +109,9 @@ class UserPreference(Base):
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     project_id: Mapped[uuid.UUID] = mapped_column(
-        UUID(as_uuid=True), ForeignKey("projects.id", ondelete="CASCADE"), nullable=False
+        UUID(as_uuid=True), ForeignKey("projects.id", ondelete="CASCADE"), nullable=False, index=True
     )
     preference_json: Mapped[dict] = mapped_column(JSONB, nullable=False)
     updated_at: Mapped[datetime] = mapped_column(
-        DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
+        DateTime(timezone=True), server_default=func.now(), server_onupdate=FetchedValue()
     )
@@ -1,45 +1,57 @@
+import os
+import time
 import uuid
 from datetime import datetime
 
-from sqlalchemy import String, Text, DateTime, func, ForeignKey
+from sqlalchemy import String, Text, DateTime, func, ForeignKey, FetchedValue
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.db.base import Base
 
 
+def _uuid7() -> uuid.UUID:
+    """Time-ordered UUID (RFC 9562 v7) so new rows land at the right edge of the PK index."""
+    value = (time.time_ns() // 1_000_000) << 80 | int.from_bytes(os.urandom(10))
+    value = (value & ~(0xF << 76)) | (0x7 << 76)  # version
+    value = (value & ~(0x3 << 62)) | (0x2 << 62)  # variant
+    return uuid.UUID(int=value)
+
+
 class Project(Base):
     __tablename__ = "projects"
 
-    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=_uuid7)
     title: Mapped[str] = mapped_column(String(255), nullable=False)
     description: Mapped[str | None] = mapped_column(Text, nullable=True)
     status: Mapped[str] = mapped_column(String(20), nullable=False, default="draft")
     current_version_id: Mapped[int | None] = mapped_column(
         ForeignKey("project_versions.id", use_alter=True, name="fk_project_current_version"),
         nullable=True,
+        index=True,
     )
     published_version_id: Mapped[int | None] = mapped_column(
         ForeignKey("project_versions.id", use_alter=True, name="fk_project_published_version"),
         nullable=True,
+        index=True,
     )
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
     updated_at: Mapped[datetime] = mapped_column(
-        DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
+        DateTime(timezone=True), server_default=func.now(), server_onupdate=FetchedValue()
     )
 
     versions: Mapped[list["ProjectVersion"]] = relationship(
         "ProjectVersion",
         back_populates="project",
         foreign_keys="ProjectVersion.project_id",
-        lazy="selectin",
+        lazy="raise",
     )
     current_version: Mapped["ProjectVersion | None"] = relationship(
         "ProjectVersion",
         foreign_keys=[current_version_id],
         post_update=True,
-        lazy="selectin",
+        lazy="joined",
     )
     chat_thread: Mapped["ChatThread | None"] = relationship(
-        "ChatThread", back_populates="project", uselist=False, lazy="selectin"
+        "ChatThread", back_populates="project", uselist=False, lazy="joined"
     )
@@ -1,16 +1,30 @@
-from sqlalchemy import Integer, String, Text, ForeignKey
+from sqlalchemy import Integer, String, Enum, ForeignKey
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.db.base import Base
+from app.db.types import CompressedText
+from app.utils.sandbox import FILE_TYPES
 
 
 class ProjectFile(Base):
     __tablename__ = "project_files"
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
-    version_id: Mapped[int] = mapped_column(ForeignKey("project_versions.id", ondelete="CASCADE"), nullable=False)
+    version_id: Mapped[int] = mapped_column(
+        ForeignKey("project_versions.id", ondelete="CASCADE"), nullable=False, index=True
+    )
     file_path: Mapped[str] = mapped_column(String(500), nullable=False)
-    content: Mapped[str] = mapped_column(Text, nullable=False, default="")
-    file_type: Mapped[str] = mapped_column(String(50), nullable=False, default="text/plain")
+    # Deferred: metadata queries skip the (possibly compressed) blob. Queries that
+    # need it ask with undefer(); an accidental lazy load raises instead of
+    # issuing a hidden per-row SELECT.
+    content: Mapped[str] = mapped_column(
+        CompressedText, nullable=False, default="", deferred=True, deferred_raiseload=True
+    )
+    file_type: Mapped[str] = mapped_column(
+        Enum(*FILE_TYPES, name="project_file_type"), nullable=False, default="text/plain"
+    )
+    # Derived from content at write time so prompt builders never rehash/recount
+    content_sha256: Mapped[str | None] = mapped_column(String(64), nullable=True)
+    token_count: Mapped[int | None] = mapped_column(Integer, nullable=True)
 
     version: Mapped["ProjectVersion"] = relationship("ProjectVersion", back_populates="files")
@@ -11,10 +11,13 @@ class ProjectVersion(Base):
     __tablename__ = "project_versions"
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
-    project_id: Mapped[str] = mapped_column(UUID(as_uuid=True), ForeignKey("projects.id", ondelete="CASCADE"), nullable=False)
+    project_id: Mapped[str] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("projects.id", ondelete="CASCADE"), nullable=False, index=True
+    )
     source_message_id: Mapped[int | None] = mapped_column(
         ForeignKey("chat_messages.id", use_alter=True, name="fk_version_source_message"),
         nullable=True,
+        index=True,
     )
     build_status: Mapped[str] = mapped_column(String(20), nullable=False, default="pending")
     build_log: Mapped[str | None] = mapped_column(Text, nullable=True)
@@ -26,5 +29,9 @@ class ProjectVersion(Base):
         foreign_keys=[project_id],
     )
     files: Mapped[list["ProjectFile"]] = relationship(
-        "ProjectFile", back_populates="version", cascade="all, delete-orphan", lazy="selectin"
+        "ProjectFile",
+        back_populates="version",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+        lazy="raise",
     )
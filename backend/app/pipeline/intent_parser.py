@@ -1,42 +1,111 @@
+import hashlib
 import json
+import re
+import time
+import uuid
+from collections import OrderedDict
 
 from openai import AsyncOpenAI
 
 from app.config import settings
 from app.pipeline.prompts.intent_parser import INTENT_PARSER_SYSTEM
 from app.schemas.pipeline import IntentResult
+from app.utils.llm import cache_routing, log_usage
 
+# (project_id, request digest) -> (expires_at, result); LRU by insertion/access order
+_INTENT_CACHE_MAX = 1024
+_intent_cache: OrderedDict[tuple[str, str], tuple[float, IntentResult]] = OrderedDict()
 
-async def parse_intent(client: AsyncOpenAI, message: str, history: list[dict], memories_context: str = "") -> IntentResult:
+
+# Short, plainly-phrased questions are classified locally and skip the LLM call.
+# Anything that reads like a change request or bug report still goes to the model.
+_FAST_INTENT_MAX_CHARS = 120
+_FAST_INTENTS = {
+    re.compile(r"^how (does|do|is|are)\b.*\?$", re.I): ("question", "simple"),
+    re.compile(r"^(what|why|when|where|which)\b.*\?$", re.I): ("question", "simple"),
+}
+_NOT_A_QUESTION = re.compile(
+    r"\b(add|change|make|fix|create|remove|delete|implement|build|update|replace|"
+    r"turn|set|can you|could you|would you|please|what if|not|doesn't|don't|broken|bug|error)\b",
+    re.I,
+)
+
+
+def _fast_intent(message: str) -> IntentResult | None:
+    text = message.strip()
+    if len(text) >= _FAST_INTENT_MAX_CHARS or _NOT_A_QUESTION.search(text):
+        return None
+    for pattern, (intent_type, complexity) in _FAST_INTENTS.items():
+        if pattern.match(text):
+            return IntentResult(
+                intent_type=intent_type, complexity=complexity, affected_areas=[], summary=text
+            )
+    return None
+
+
+def _intent_cache_key(
+    project_id: uuid.UUID | None, message: str, history: list[dict], memories_context: str
+) -> tuple[str, str]:
+    payload = json.dumps(
+        {"m": message, "h": history, "ctx": memories_context, "model": settings.openai_model_classify},
+        sort_keys=True,
+    )
+    return str(project_id), hashlib.sha256(payload.encode()).hexdigest()
+
+
+def purge_intent_cache(project_id: uuid.UUID) -> None:
+    """Drop cached intents for a project."""
+    project_key = str(project_id)
+    for key in [k for k in _intent_cache if k[0] == project_key]:
+        del _intent_cache[key]
+
+
+async def parse_intent(
+    client: AsyncOpenAI,
+    message: str,
+    history: list[dict],
+    memories_context: str = "",
+    project_id: uuid.UUID | None = None,
+) -> IntentResult:
+    fast = _fast_intent(message)
+    if fast is not None:
+        return fast
+
+    history = history[-10:]  # Last 10 messages for context
+    cache_key = _intent_cache_key(project_id, message, history, memories_context)
+    cached = _intent_cache.get(cache_key)
+    if cached is not None:
+        expires_at, result = cached
+        if expires_at > time.monotonic():
+            _intent_cache.move_to_end(cache_key)
+            return result
+        del _intent_cache[cache_key]
+
+    # Static system prompt first, then history, then per-request context, so
+    # the provider's prefix cache covers as much of the prompt as possible.
     messages = [
         {"role": "system", "content": INTENT_PARSER_SYSTEM},
+        *history,
     ]
     if memories_context:
         messages.append({"role": "system", "content": memories_context})
-    messages.extend([
-        *history[-10:],  # Last 10 messages for context
-        {"role": "user", "content": message},
-    ])
+    messages.append({"role": "user", "content": message})
 
     response = await client.chat.completions.create(
-        model=settings.openai_model,
+        model=settings.openai_model_classify,
         messages=messages,
-        temperature=0.1,
-        **settings.max_tokens_param(500),
+        temperature=0.0,  # deterministic, so cached results match a fresh call
+        response_format={"type": "json_object"},
+        **settings.max_tokens_param(500, classify=True),
+        **cache_routing(f"proj:{project_id}" if project_id else None, "intent_parser"),
     )
+    log_usage("intent_parser", response)
 
     content = response.choices[0].message.content or "{}"
-    # Strip markdown code fences if present
-    content = content.strip()
-    if content.startswith("```"):
-        content = content.split("\n", 1)[1] if "\n" in content else content[3:]
-        if content.endswith("```"):
-            content = content[:-3]
-        content = content.strip()
 
     try:
         data = json.loads(content)
-        return IntentResult(**data)
+        result = IntentResult(**data)
     except (json.JSONDecodeError, ValueError):
         return IntentResult(
             intent_type="other",
@@ -44,3 +113,8 @@ async def parse_intent(client: AsyncOpenAI, message: str, history: list[dict], m
             affected_areas=[],
             summary=message,
         )
+
+    _intent_cache[cache_key] = (time.monotonic() + settings.intent_cache_ttl, result)
+    if len(_intent_cache) > _INTENT_CACHE_MAX:
+        _intent_cache.popitem(last=False)
+    return result
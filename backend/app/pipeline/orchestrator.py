@@ -1,5 +1,7 @@
+import asyncio
 import uuid
-from collections.abc import AsyncGenerator
+from collections.abc import AsyncGenerator, Collection, Iterable
+from dataclasses import dataclass, field
 
 from openai import AsyncOpenAI
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -10,30 +12,54 @@ from app.pipeline.builder import execute_build
 from app.pipeline.fix_agent import fix_errors
 from app.services.build_service import validate_build
 from app.services.version_service import create_version
-from app.services.chat_service import get_or_create_thread, add_message
-from app.services.memory_service import get_relevant_memories_for_prompt, extract_memories_from_conversation, create_memory
+from app.services.chat_service import get_or_create_thread_id, add_message
+from app.services.memory_service import get_relevant_memories_for_prompt, extract_memories_from_conversation, create_memories
+from app.utils.llm import cache_routing
 from app.utils.sse import sse_stage_change, sse_build_status, sse_token, sse_error, sse_done
 
 MAX_FIX_RETRIES = 3
 
+_MIME_BY_EXT = {"html": "text/html", "css": "text/css", "js": "application/javascript"}
+_DEFAULT_MIME = "text/plain"
 
-def apply_file_ops(current_files: list[dict], file_ops: list[dict]) -> list[dict]:
-    """Apply file operations to current files and return updated file list."""
-    files_map = {f["file_path"]: f for f in current_files}
 
-    for op in file_ops:
-        if op["action"] == "write":
-            ext = op["file_path"].rsplit(".", 1)[-1] if "." in op["file_path"] else ""
-            mime_map = {"html": "text/html", "css": "text/css", "js": "application/javascript"}
-            files_map[op["file_path"]] = {
-                "file_path": op["file_path"],
-                "content": op["content"],
-                "file_type": mime_map.get(ext, "text/plain"),
-            }
-        elif op["action"] == "delete":
-            files_map.pop(op["file_path"], None)
+@dataclass
+class FilesState:
+    """Working set of project files for one pipeline run, keyed by file path."""
 
-    return list(files_map.values())
+    paths: dict[str, dict] = field(default_factory=dict)
+
+    @classmethod
+    def from_files(cls, files: Iterable[dict]) -> "FilesState":
+        return cls({f["file_path"]: f for f in files})
+
+    def values(self) -> Collection[dict]:
+        return self.paths.values()
+
+
+def apply_file_op(state: FilesState, op: dict) -> None:
+    """Apply a single file operation to the working set in place."""
+    if op["action"] == "write":
+        _, dot, ext = op["file_path"].rpartition(".")
+        state.paths[op["file_path"]] = {
+            "file_path": op["file_path"],
+            "content": op["content"],
+            "file_type": _MIME_BY_EXT.get(ext, _DEFAULT_MIME) if dot else _DEFAULT_MIME,
+        }
+    elif op["action"] == "delete":
+        state.paths.pop(op["file_path"], None)
+
+
+def _relevant_fix_paths(errors: list[str], state: FilesState, touched: set[str]) -> set[str]:
+    """Files the fix agent needs in full: those named in errors, plus last attempt's edits.
+
+    Validation errors that don't name a file are about index.html.
+    """
+    paths = state.paths.keys()
+    relevant = set(touched) | {"index.html"}
+    for error in errors:
+        relevant.update(p for p in paths if p in error)
+    return relevant & paths
 
 
 async def run_pipeline(
@@ -45,22 +71,26 @@ async def run_pipeline(
     current_files: list[dict],
 ) -> AsyncGenerator[str, None]:
     """Run the 4-stage prompt pipeline. Yields SSE-formatted events."""
+    cache_key = f"proj:{project_id}"
 
-    # Retrieve relevant memories for this message
-    memories_context = ""
-    try:
-        memories_context = await get_relevant_memories_for_prompt(db, client, project_id, message)
-    except Exception:
-        pass  # Graceful degradation — continue without memories
-
-    # Stage 1: Intent Parsing
+    # Stage 1: Intent Parsing, concurrently with memory retrieval.
+    # Intent parsing doesn't touch the db session, so the two can overlap;
+    # memories still feed the planner, builder and fixer below.
     yield sse_stage_change("intent_parser")
-    try:
-        intent = await parse_intent(client, message, history, memories_context)
-    except Exception as e:
-        yield sse_error(f"Intent parsing failed: {e}")
+    memories_result, intent_result = await asyncio.gather(
+        get_relevant_memories_for_prompt(db, client, project_id, message),
+        parse_intent(client, message, history, project_id=project_id),
+        return_exceptions=True,
+    )
+
+    # Graceful degradation — continue without memories
+    memories_context = memories_result if isinstance(memories_result, str) else ""
+
+    if isinstance(intent_result, BaseException):
+        yield sse_error(f"Intent parsing failed: {intent_result}")
         yield sse_done()
         return
+    intent = intent_result
 
     yield sse_token(f"Intent: {intent.intent_type} ({intent.complexity}) - {intent.summary}")
 
@@ -78,12 +108,13 @@ async def run_pipeline(
                 ],
                 temperature=0.7,
                 **settings.max_tokens_param(1000),
+                **cache_routing(cache_key, "responder"),
             )
             answer = response.choices[0].message.content or ""
             yield sse_token(answer)
             # Save assistant response
-            thread = await get_or_create_thread(db, project_id)
-            await add_message(db, thread.id, "assistant", answer)
+            thread_id = await get_or_create_thread_id(db, project_id)
+            await add_message(db, thread_id, "assistant", answer)
         except Exception as e:
             yield sse_error(f"Failed to respond: {e}")
         yield sse_done()
@@ -92,7 +123,9 @@ async def run_pipeline(
     # Stage 2: Planning
     yield sse_stage_change("planner")
     try:
-        plan = await create_plan(client, intent.model_dump_json(), current_files, memories_context)
+        plan = await create_plan(
+            client, intent.model_dump_json(), current_files, memories_context, cache_key
+        )
     except Exception as e:
         yield sse_error(f"Planning failed: {e}")
         yield sse_done()
@@ -108,11 +141,16 @@ async def run_pipeline(
 
     # Stage 3: Building
     yield sse_stage_change("builder")
-    file_ops = []
+    # File operations are applied as they stream in rather than collected first
+    files = FilesState.from_files(current_files)
+    changed = False
     try:
-        async for event in execute_build(client, plan.model_dump_json(), current_files, memories_context):
-            if isinstance(event, dict) and "__file_ops__" in event:
-                file_ops = event["__file_ops__"]
+        async for event in execute_build(
+            client, plan.model_dump_json(), current_files, memories_context, cache_key
+        ):
+            if isinstance(event, dict) and "__file_op__" in event:
+                apply_file_op(files, event["__file_op__"])
+                changed = True
             elif isinstance(event, str):
                 yield event
     except Exception as e:
@@ -120,18 +158,18 @@ async def run_pipeline(
         yield sse_done()
         return
 
-    if not file_ops:
+    if not changed:
         yield sse_token("No file changes were made.")
         yield sse_done()
         return
 
-    # Apply file operations
-    updated_files = apply_file_ops(current_files, file_ops)
-
     # Stage 4: Validate + Fix loop
     yield sse_stage_change("validation")
+    fixed_paths: set[str] = set()
     for attempt in range(MAX_FIX_RETRIES + 1):
-        build_result = validate_build(updated_files)
+        # Regex scans over whole files; keep them off the event loop so other
+        # streams keep flowing
+        build_result = await asyncio.to_thread(validate_build, files.values())
 
         if build_result.success:
             yield sse_build_status(True)
@@ -141,11 +179,16 @@ async def run_pipeline(
 
             if attempt < MAX_FIX_RETRIES:
                 yield sse_stage_change("fix_agent")
+                relevant = _relevant_fix_paths(build_result.errors, files, fixed_paths)
+                fixed_paths = set()
                 try:
-                    async for event in fix_errors(client, build_result.errors, updated_files, memories_context):
-                        if isinstance(event, dict) and "__file_ops__" in event:
-                            fix_ops = event["__file_ops__"]
-                            updated_files = apply_file_ops(updated_files, fix_ops)
+                    async for event in fix_errors(
+                        client, build_result.errors, files.values(), memories_context, relevant, cache_key
+                    ):
+                        if isinstance(event, dict) and "__file_op__" in event:
+                            op = event["__file_op__"]
+                            apply_file_op(files, op)
+                            fixed_paths.add(op["file_path"])
                         elif isinstance(event, str):
                             yield event
                 except Exception as e:
@@ -155,12 +198,12 @@ async def run_pipeline(
 
     # Save version with updated files
     try:
-        thread = await get_or_create_thread(db, project_id)
-        assistant_msg = await add_message(db, thread.id, "assistant", f"Built: {plan_summary}")
+        thread_id = await get_or_create_thread_id(db, project_id)
+        assistant_msg = await add_message(db, thread_id, "assistant", f"Built: {plan_summary}")
         version = await create_version(
             db,
             project_id,
-            updated_files,
+            files.values(),
             source_message_id=assistant_msg.id,
             build_status="success" if build_result.success else "failed",
             build_log="\n".join(build_result.errors) if build_result.errors else None,
@@ -170,9 +213,8 @@ async def run_pipeline(
         # Auto-extract memories after successful build
         if build_result.success:
             try:
-                facts = await extract_memories_from_conversation(client, message, history, updated_files)
-                for fact in facts:
-                    await create_memory(db, client, project_id, fact, source="auto")
+                facts = await extract_memories_from_conversation(client, message, history, files.values())
+                await create_memories(db, client, project_id, facts, source="auto")
             except Exception:
                 pass  # Graceful degradation
     except Exception as e:
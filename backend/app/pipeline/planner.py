@@ -5,6 +5,7 @@ from openai import AsyncOpenAI
 from app.config import settings
 from app.pipeline.prompts.planner import PLANNER_SYSTEM, build_planner_prompt
 from app.schemas.pipeline import PlanResult
+from app.utils.llm import cache_routing, log_usage
 
 
 async def create_plan(
@@ -12,26 +13,24 @@ async def create_plan(
     intent_json: str,
     current_files: list[dict],
     memories_context: str = "",
+    cache_key: str | None = None,
 ) -> PlanResult:
     prompt = build_planner_prompt(intent_json, current_files, memories_context)
 
     response = await client.chat.completions.create(
-        model=settings.openai_model,
+        model=settings.openai_model_classify,
         messages=[
             {"role": "system", "content": PLANNER_SYSTEM},
             {"role": "user", "content": prompt},
         ],
         temperature=0.2,
-        **settings.max_tokens_param(1000),
+        response_format={"type": "json_object"},
+        **settings.max_tokens_param(1000, classify=True),
+        **cache_routing(cache_key, "planner"),
     )
+    log_usage("planner", response)
 
     content = response.choices[0].message.content or "{}"
-    content = content.strip()
-    if content.startswith("```"):
-        content = content.split("\n", 1)[1] if "\n" in content else content[3:]
-        if content.endswith("```"):
-            content = content[:-3]
-        content = content.strip()
 
     try:
         data = json.loads(content)
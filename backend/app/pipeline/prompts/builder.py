@@ -24,16 +24,17 @@ After completing all file operations, provide a brief summary of what you built.
 
 
 def build_builder_prompt(plan_json: str, current_files: list[dict], memories_context: str = "") -> str:
-    files_content = ""
-    for f in current_files:
-        files_content += f"\n--- {f['file_path']} ---\n{f['content']}\n"
+    files_content = "".join(
+        f"\n--- {f['file_path']} ---\n{f['content']}\n" for f in current_files
+    )
 
     memory_section = f"\n\n{memories_context}\n" if memories_context else ""
 
-    return f"""File plan to execute:
-{plan_json}
-
-Current file contents:
+    # File contents first: they change less often than the plan and memories
+    return f"""Current file contents:
 {files_content}
 {memory_section}
+File plan to execute:
+{plan_json}
+
 Execute the plan by calling write_file for each file that needs to be created or modified, and delete_file for any files to remove. Write COMPLETE file contents."""
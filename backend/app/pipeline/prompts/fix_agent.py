@@ -1,3 +1,5 @@
+from collections.abc import Collection
+
 FIX_AGENT_SYSTEM = """You are a fix agent for a web app/game generator. You receive build errors and must fix them with minimal changes.
 
 RULES:
@@ -11,18 +13,31 @@ You have the same tools available:
 - delete_file(file_path): Delete a file"""
 
 
-def build_fix_prompt(errors: list[str], current_files: list[dict], memories_context: str = "") -> str:
-    files_content = ""
-    for f in current_files:
-        files_content += f"\n--- {f['file_path']} ---\n{f['content']}\n"
+def build_fix_prompt(
+    errors: list[str],
+    current_files: Collection[dict],
+    memories_context: str = "",
+    relevant_paths: set[str] | None = None,
+) -> str:
+    shown = current_files
+    other_files = ""
+    if relevant_paths is not None:
+        shown = [f for f in current_files if f["file_path"] in relevant_paths]
+        others = [f["file_path"] for f in current_files if f["file_path"] not in relevant_paths]
+        if others:
+            other_files = f"\nOther project files (unchanged, not shown): {', '.join(others)}\n"
+
+    files_content = "".join(
+        f"\n--- {f['file_path']} ---\n{f['content']}\n" for f in shown
+    )
 
     error_list = "\n".join(f"- {e}" for e in errors)
     memory_section = f"\n\n{memories_context}\n" if memories_context else ""
 
-    return f"""Build errors to fix:
+    return f"""Current file contents:
+{files_content}{other_files}
+{memory_section}
+Build errors to fix:
 {error_list}
 
-Current file contents:
-{files_content}
-{memory_section}
 Fix ONLY the reported errors with minimal changes."""
@@ -1,3 +1,8 @@
+import hashlib
+
+from app.utils.llm import estimate_tokens
+
+
 PLANNER_SYSTEM = """You are a file planner for a web app/game generator. Given the user's intent and current project files, create a plan of file operations.
 
 The project is a self-contained web app with these constraints:
@@ -19,9 +24,18 @@ Example:
 """
 
 
+def _manifest_line(f: dict) -> str:
+    # Stored files carry a precomputed hash/count; only legacy rows fall back to computing
+    digest = f.get("content_sha256") or hashlib.sha256(f["content"].encode("utf-8")).hexdigest()
+    tokens = f.get("token_count") or estimate_tokens(f["content"])
+    return f"- {f['file_path']} [{digest[:8]}, ~{tokens} tokens]"
+
+
 def build_planner_prompt(intent_json: str, current_files: list[dict], memories_context: str = "") -> str:
+    # Sorted and keyed by content hash so the prefix stays byte-identical
+    # between calls unless a file actually changed (keeps prompt caching warm)
     files_summary = "\n".join(
-        f"- {f['file_path']} ({len(f['content'])} chars)" for f in current_files
+        _manifest_line(f) for f in sorted(current_files, key=lambda f: f["file_path"])
     )
     memory_section = f"\n\n{memories_context}\n" if memories_context else ""
     return f"""Current project files:
@@ -0,0 +1,149 @@
+import json
+import re
+from collections.abc import AsyncGenerator
+
+from openai import AsyncOpenAI
+
+from app.config import settings
+from app.pipeline.tools import TOOL_DEFINITIONS
+from app.utils.llm import cache_routing, log_usage
+from app.utils.sse import TokenCoalescer, sse_tool_call
+
+# file_path is a short leading argument; only this much of the argument
+# stream is inspected to announce a tool call before its content arrives.
+_ARGS_HEAD_CHARS = 512
+_FILE_PATH_RE = re.compile(r'"file_path"\s*:\s*"((?:[^"\\]|\\.)*)"')
+
+
+def _peek_file_path(head: str) -> str | None:
+    match = _FILE_PATH_RE.search(head)
+    if not match:
+        return None
+    try:
+        return json.loads(f'"{match.group(1)}"')
+    except json.JSONDecodeError:
+        return None
+
+
+async def run_tool_loop(
+    client: AsyncOpenAI,
+    messages: list[dict],
+    label: str,
+    cache_key: str | None = None,
+) -> AsyncGenerator[str | dict, None]:
+    """Drive a streamed write_file/delete_file tool loop.
+
+    Content tokens are forwarded as SSE events, coalesced over
+    settings.sse_coalesce_ms so a fast stream isn't one frame per chunk; tool-call
+    arguments are accumulated per call index as fragments (joined and parsed
+    once, when the turn ends). The tool_call event is sent as soon as the
+    file_path argument has streamed in, not after the whole file body.
+    Each file operation is yielded as {"__file_op__": {...}} (not SSE) as soon
+    as its call is parsed, so callers can apply it without buffering.
+    """
+    while True:
+        stream = await client.chat.completions.create(
+            model=settings.openai_model,
+            messages=messages,
+            tools=TOOL_DEFINITIONS,
+            temperature=0.1,
+            stream=True,
+            stream_options={"include_usage": True},
+            **cache_routing(cache_key, label),
+            **settings.max_tokens_param(16000),
+        )
+
+        content_parts: list[str] = []
+        tokens = TokenCoalescer(settings.sse_coalesce_ms)
+        # index -> {"id", "name", "arguments": [fragments], "head", "announced"}
+        tool_calls: dict[int, dict] = {}
+        finish_reason = None
+
+        async for chunk in stream:
+            if chunk.usage is not None:
+                log_usage(label, chunk)
+            if not chunk.choices:
+                continue
+            choice = chunk.choices[0]
+            delta = choice.delta
+            if delta.content:
+                content_parts.append(delta.content)
+                if (event := tokens.add(delta.content)) is not None:
+                    yield event
+            for tc in delta.tool_calls or ():
+                call = tool_calls.setdefault(
+                    tc.index,
+                    {"id": None, "name": "", "arguments": [], "head": "", "announced": False},
+                )
+                if tc.id:
+                    call["id"] = tc.id
+                if tc.function:
+                    if tc.function.name:
+                        call["name"] += tc.function.name
+                    if tc.function.arguments:
+                        call["arguments"].append(tc.function.arguments)
+                        if not call["announced"] and len(call["head"]) < _ARGS_HEAD_CHARS:
+                            call["head"] += tc.function.arguments
+                            file_path = _peek_file_path(call["head"])
+                            if file_path is not None:
+                                call["announced"] = True
+                                if (event := tokens.flush()) is not None:
+                                    yield event
+                                yield sse_tool_call(call["name"], {"file_path": file_path})
+            if choice.finish_reason:
+                finish_reason = choice.finish_reason
+
+        if (event := tokens.flush()) is not None:
+            yield event
+
+        if not tool_calls:
+            break
+
+        calls = [tool_calls[i] for i in sorted(tool_calls)]
+        messages.append({
+            "role": "assistant",
+            "content": "".join(content_parts) or None,
+            "tool_calls": [
+                {
+                    "id": c["id"],
+                    "type": "function",
+                    "function": {"name": c["name"], "arguments": "".join(c["arguments"])},
+                }
+                for c in calls
+            ],
+        })
+
+        for call in calls:
+            fn_name = call["name"]
+            try:
+                args = json.loads("".join(call["arguments"]))
+            except json.JSONDecodeError:
+                args = {}
+
+            if not call["announced"]:
+                yield sse_tool_call(fn_name, {"file_path": args.get("file_path", "")})
+
+            if fn_name == "write_file":
+                yield {"__file_op__": {
+                    "action": "write",
+                    "file_path": args["file_path"],
+                    "content": args["content"],
+                }}
+                result = f"File written: {args['file_path']}"
+            elif fn_name == "delete_file":
+                yield {"__file_op__": {
+                    "action": "delete",
+                    "file_path": args["file_path"],
+                }}
+                result = f"File deleted: {args['file_path']}"
+            else:
+                result = f"Unknown tool: {fn_name}"
+
+            messages.append({
+                "role": "tool",
+                "tool_call_id": call["id"],
+                "content": result,
+            })
+
+        if finish_reason == "stop":
+            break
@@ -1,3 +1,4 @@
+import asyncio
 import uuid
 
 from fastapi import APIRouter, Depends, HTTPException
@@ -7,7 +8,7 @@ from app.dependencies import get_db
 from app.models.project import Project
 from app.schemas.pipeline import BuildResult
 from app.services.build_service import validate_build
-from app.services.file_service import get_current_files
+from app.services.file_service import get_current_file_dicts
 
 router = APIRouter(prefix="/api/v1/projects/{project_id}/build", tags=["build"])
 
@@ -18,9 +19,8 @@ async def build_project(project_id: uuid.UUID, db: AsyncSession = Depends(get_db
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
 
-    files = await get_current_files(db, project_id)
-    file_dicts = [{"file_path": f.file_path, "content": f.content, "file_type": f.file_type} for f in files]
-    result = validate_build(file_dicts)
+    file_dicts = await get_current_file_dicts(db, project_id)
+    result = await asyncio.to_thread(validate_build, file_dicts)
 
     if result.success:
         project.status = "running"
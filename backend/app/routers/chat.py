@@ -1,27 +1,55 @@
 import asyncio
 import uuid
-from collections import defaultdict
+from collections import OrderedDict
 
 from fastapi import APIRouter, Depends, HTTPException
 from fastapi.responses import StreamingResponse
+from openai import AsyncOpenAI
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.dependencies import get_db, get_openai_client
+from app.models.project import Project
 from app.schemas.chat import ChatSendRequest, ChatMessageResponse
 from app.services import chat_service
-from app.services.file_service import get_current_files
+from app.services.file_service import get_current_file_dicts
 from app.pipeline.orchestrator import run_pipeline
 from app.utils.sse import sse_error, sse_done
+from app.utils.responses import ListResponder
 
 router = APIRouter(prefix="/api/v1/projects/{project_id}/chat", tags=["chat"])
 
-# Per-project build lock
-_project_locks: dict[uuid.UUID, asyncio.Lock] = defaultdict(asyncio.Lock)
+_MESSAGE_LIST = ListResponder(ChatMessageResponse)
+
+
+class _LockRegistry:
+    """Per-project build locks, bounded LRU so idle projects don't pin memory."""
+
+    def __init__(self, cap: int = 1024):
+        self._locks: OrderedDict[uuid.UUID, asyncio.Lock] = OrderedDict()
+        self._cap = cap
+
+    def get(self, project_id: uuid.UUID) -> asyncio.Lock:
+        lock = self._locks.get(project_id)
+        if lock is not None:
+            self._locks.move_to_end(project_id)
+            return lock
+        lock = self._locks[project_id] = asyncio.Lock()
+        if len(self._locks) > self._cap:
+            # Evict the least recently used lock nobody is holding
+            for pid, candidate in self._locks.items():
+                if not candidate.locked() and pid != project_id:
+                    del self._locks[pid]
+                    break
+        return lock
+
+
+_project_locks = _LockRegistry()
 
 
 @router.get("/messages", response_model=list[ChatMessageResponse])
 async def get_messages(project_id: uuid.UUID, db: AsyncSession = Depends(get_db)):
-    return await chat_service.get_messages(db, project_id)
+    return _MESSAGE_LIST(await chat_service.get_messages(db, project_id))
 
 
 @router.post("/send")
@@ -29,34 +57,26 @@ async def send_message(
     project_id: uuid.UUID,
     data: ChatSendRequest,
     db: AsyncSession = Depends(get_db),
+    client: AsyncOpenAI = Depends(get_openai_client),
 ):
-    from app.models.project import Project
-
-    project = await db.get(Project, project_id)
-    if not project:
+    # Existence check only; db.get() would also join-load the current version and thread
+    if not await db.scalar(select(1).where(Project.id == project_id)):
         raise HTTPException(status_code=404, detail="Project not found")
 
-    thread = await chat_service.get_or_create_thread(db, project_id)
-    user_msg = await chat_service.add_message(db, thread.id, "user", data.message)
-
-    client = get_openai_client()
+    thread_id = await chat_service.get_or_create_thread_id(db, project_id)
+    user_msg = await chat_service.add_message(db, thread_id, "user", data.message)
 
     async def event_stream():
-        lock = _project_locks[project_id]
+        lock = _project_locks.get(project_id)
         async with lock:
             try:
                 # Get current files for context
-                files = await get_current_files(db, project_id)
-                file_dicts = [
-                    {"file_path": f.file_path, "content": f.content, "file_type": f.file_type}
-                    for f in files
-                ]
+                file_dicts = await get_current_file_dicts(db, project_id)
 
                 # Get conversation history
-                history = await chat_service.get_thread_messages_for_ai(db, thread.id)
+                history = await chat_service.get_thread_messages_for_ai(db, thread_id)
 
-                version_id = None
-                assistant_content = ""
+                # run_pipeline persists the assistant reply itself
                 async for event in run_pipeline(
                     client=client,
                     db=db,
@@ -66,14 +86,6 @@ async def send_message(
                     current_files=file_dicts,
                 ):
                     yield event
-                    # Track assistant content and version from events
-                    if "version_id" in event:
-                        pass  # version tracking handled by done event
-
-                # Save assistant response
-                if assistant_content:
-                    await chat_service.add_message(db, thread.id, "assistant", assistant_content)
-
             except Exception as e:
                 yield sse_error(str(e))
                 yield sse_done()
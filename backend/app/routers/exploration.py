@@ -3,6 +3,7 @@ import uuid
 from fastapi import APIRouter, Depends, HTTPException
 from fastapi.responses import HTMLResponse
 from openai import AsyncOpenAI
+from pydantic import TypeAdapter
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.dependencies import get_db, get_openai_client
@@ -22,21 +23,31 @@ from app.schemas.exploration import (
     PreviewOptionResponse,
     FixPreviewRequest,
     FixPreviewResponse,
+    PreviewErrorInfo,
 )
 from app.services import exploration_service
 from app.services.exploration_service import get_debug_log, clear_debug_log
+from app.templates.phaser_demos import PHASER_DEMO_CATALOG
+from app.utils.responses import ListResponder
 
 router = APIRouter(prefix="/api/v1/projects/{project_id}", tags=["exploration"])
 debug_router = APIRouter(prefix="/api/v1/debug", tags=["debug"])
 
+_MEMORY_NOTE_LIST = ListResponder(MemoryNoteResponse)
 
-def _get_template_files(template_id: str) -> list[dict] | None:
-    """Backward compat: look up template files for old preview endpoint."""
-    from app.templates.phaser_demos import PHASER_DEMO_CATALOG
-    for t in PHASER_DEMO_CATALOG:
-        if t["template_id"] == template_id:
-            return t["files"]
-    return None
+# Dumps the whole error list in one pydantic-core call; fix_preview keeps
+# the first five itself, and the preview's error catcher sends no more
+_PREVIEW_ERRORS = TypeAdapter(list[PreviewErrorInfo])
+
+
+# Backward compat for the old preview endpoint: template_id -> index.html
+# (None when the template has no index.html), built once at import
+_TEMPLATE_INDEX_HTML: dict[str, str | None] = {
+    t["template_id"]: next(
+        (f["content"] for f in t["files"] if f["file_path"] == "index.html"), None
+    )
+    for t in PHASER_DEMO_CATALOG
+}
 
 
 @router.post("/explore", response_model=ExploreResponse)
@@ -135,7 +146,7 @@ async def list_memory_notes(
     db: AsyncSession = Depends(get_db),
 ):
     """List all exploration memory notes for this project."""
-    return await exploration_service.list_memory_notes(db, project_id)
+    return _MEMORY_NOTE_LIST(await exploration_service.list_memory_notes(db, project_id))
 
 
 @router.post("/exploration/preview_option", response_model=PreviewOptionResponse)
@@ -170,7 +181,7 @@ async def fix_preview(
     try:
         await exploration_service.fix_preview(
             db, client, data.session_id, data.option_id,
-            [e.model_dump() for e in data.errors],
+            _PREVIEW_ERRORS.dump_python(data.errors),
         )
         return FixPreviewResponse(
             session_id=data.session_id,
@@ -181,21 +192,6 @@ async def fix_preview(
         raise HTTPException(status_code=400, detail=str(e))
 
 
-_ERROR_CATCHER_SCRIPT = """<script>
-(function(){
-  var errors=[];
-  window.onerror=function(msg,url,line,col,err){
-    if(errors.length<5){
-      errors.push({message:String(msg),line:line,col:col,stack:err?err.stack:''});
-      window.parent.postMessage({type:'preview-runtime-error',
-        errors:errors},'*');
-    }
-    return true;
-  };
-})();
-</script>"""
-
-
 @router.get("/exploration/preview_option/{session_id}/{option_id}")
 async def get_preview_option(
     project_id: uuid.UUID,
@@ -208,11 +204,7 @@ async def get_preview_option(
     html = await exploration_service.get_cached_preview(db, cache_key)
     if not html:
         raise HTTPException(status_code=404, detail="Preview not ready")
-    # Inject error catcher right after <head>
-    if "<head>" in html:
-        html = html.replace("<head>", "<head>" + _ERROR_CATCHER_SCRIPT, 1)
-    elif "<HEAD>" in html:
-        html = html.replace("<HEAD>", "<HEAD>" + _ERROR_CATCHER_SCRIPT, 1)
+    # The error catcher is injected when the preview is cached
     return HTMLResponse(content=html)
 
 
@@ -222,15 +214,13 @@ async def preview_template(
     template_id: str,
 ):
     """Preview a template's HTML content (for iframe preview during exploration)."""
-    template_files = _get_template_files(template_id)
-    if not template_files:
+    if template_id not in _TEMPLATE_INDEX_HTML:
         raise HTTPException(status_code=404, detail="Template not found")
 
-    for f in template_files:
-        if f["file_path"] == "index.html":
-            return HTMLResponse(content=f["content"])
-
-    raise HTTPException(status_code=404, detail="No index.html in template")
+    html = _TEMPLATE_INDEX_HTML[template_id]
+    if html is None:
+        raise HTTPException(status_code=404, detail="No index.html in template")
+    return HTMLResponse(content=html)
 
 
 # ─── Debug endpoints ──────────────────────────────────────
@@ -1,6 +1,7 @@
 import uuid
 
 from fastapi import APIRouter, Depends
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.dependencies import get_db
@@ -12,4 +13,5 @@ router = APIRouter(prefix="/api/v1/projects/{project_id}/files", tags=["files"])
 
 @router.get("", response_model=list[ProjectFileResponse])
 async def list_files(project_id: uuid.UUID, db: AsyncSession = Depends(get_db)):
-    return await file_service.get_current_files(db, project_id)
+    # Plain column dicts straight to orjson; response_model stays for the schema
+    return ORJSONResponse(await file_service.get_current_file_listing(db, project_id))
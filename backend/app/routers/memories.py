@@ -7,13 +7,16 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.dependencies import get_db, get_openai_client
 from app.schemas.memory import MemoryCreate, MemoryUpdate, MemorySearch, MemoryResponse
 from app.services import memory_service
+from app.utils.responses import ListResponder
 
 router = APIRouter(prefix="/api/v1/projects/{project_id}/memories", tags=["memories"])
 
+_MEMORY_LIST = ListResponder(MemoryResponse)
+
 
 @router.get("", response_model=list[MemoryResponse])
 async def list_memories(project_id: uuid.UUID, db: AsyncSession = Depends(get_db)):
-    return await memory_service.list_memories(db, project_id)
+    return _MEMORY_LIST(await memory_service.list_memories(db, project_id))
 
 
 @router.post("", response_model=MemoryResponse)
@@ -58,4 +61,6 @@ async def search_memories(
     db: AsyncSession = Depends(get_db),
     client: AsyncOpenAI = Depends(get_openai_client),
 ):
-    return await memory_service.search_memories(db, client, project_id, data.query, data.limit)
+    return _MEMORY_LIST(
+        await memory_service.search_memories(db, client, project_id, data.query, data.limit)
+    )
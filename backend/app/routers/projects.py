@@ -6,9 +6,12 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.dependencies import get_db
 from app.schemas.project import ProjectCreate, ProjectUpdate, ProjectResponse
 from app.services import project_service
+from app.utils.responses import ListResponder
 
 router = APIRouter(prefix="/api/v1/projects", tags=["projects"])
 
+_PROJECT_LIST = ListResponder(ProjectResponse)
+
 
 @router.post("", response_model=ProjectResponse, status_code=201)
 async def create_project(data: ProjectCreate, db: AsyncSession = Depends(get_db)):
@@ -17,7 +20,7 @@ async def create_project(data: ProjectCreate, db: AsyncSession = Depends(get_db)
 
 @router.get("", response_model=list[ProjectResponse])
 async def list_projects(db: AsyncSession = Depends(get_db)):
-    return await project_service.list_projects(db)
+    return _PROJECT_LIST(await project_service.list_projects(db))
 
 
 @router.get("/{project_id}", response_model=ProjectResponse)
@@ -6,13 +6,16 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.dependencies import get_db
 from app.schemas.project_version import ProjectVersionListItem
 from app.services import version_service
+from app.utils.responses import ListResponder
 
 router = APIRouter(prefix="/api/v1/projects/{project_id}/versions", tags=["versions"])
 
+_VERSION_LIST = ListResponder(ProjectVersionListItem)
+
 
 @router.get("", response_model=list[ProjectVersionListItem])
 async def list_versions(project_id: uuid.UUID, db: AsyncSession = Depends(get_db)):
-    return await version_service.list_versions(db, project_id)
+    return _VERSION_LIST(await version_service.list_versions(db, project_id))
 
 
 @router.post("/{version_id}/rollback", response_model=ProjectVersionListItem)
@@ -1,4 +1,5 @@
 import re
+from collections.abc import Collection
 
 from app.schemas.pipeline import BuildResult
 
@@ -11,55 +12,131 @@ FORBIDDEN_PATTERNS = [
     r'<link\s+.*href=["\']https?://',
 ]
 
+# All forbidden patterns as one alternation, so each file is scanned once;
+# group g<i> maps back to FORBIDDEN_PATTERNS[i] for the warning text
+_FORBIDDEN_RE = re.compile("|".join(f"(?P<g{i}>{p})" for i, p in enumerate(FORBIDDEN_PATTERNS)))
+_FORBIDDEN_BY_GROUP = {f"g{i}": p for i, p in enumerate(FORBIDDEN_PATTERNS)}
+
+# Case-insensitive; each search stops at the first hit, which for these tags
+# is near the top of the document
+_HTML_ROOT_RE = re.compile(r"<!doctype html>|<html\b", re.IGNORECASE)
+_HEAD_RE = re.compile(r"<head\b", re.IGNORECASE)
+_BODY_RE = re.compile(r"<body\b", re.IGNORECASE)
+
+# External references (http(s), data:, #fragment, mailto:) are rejected by the
+# lookahead right after the opening quote, so only local refs ever match
+_LOCAL_REF = r'(?:src|href)=["\'](?!https?://|data:|#|mailto:)(?P<ref>[^"\']+)["\']'
+_REFS_RE = re.compile(_LOCAL_REF)
+
+# index.html gets every check in one pass: forbidden patterns, local
+# references and the structural tags, told apart by m.lastgroup
+_INDEX_SCAN_RE = re.compile("|".join([
+    _FORBIDDEN_RE.pattern,
+    _LOCAL_REF,
+    r"(?P<root>(?i:<!doctype html>|<html\b))",
+    r"(?P<head>(?i:<head\b))",
+    r"(?P<body>(?i:<body\b))",
+]))
+_ROOT, _HEAD, _BODY = 1, 2, 4
+_STRUCTURE_BITS = {"root": _ROOT, "head": _HEAD, "body": _BODY}
+_STRUCTURE_ERRORS = (
+    (_ROOT, "Missing <!DOCTYPE html> or <html> tag"),
+    (_HEAD, "Missing <head> section"),
+    (_BODY, "Missing <body> section"),
+)
+
 
 def validate_html(content: str) -> list[str]:
     errors = []
-    if "<!DOCTYPE html>" not in content and "<html" not in content:
+    if not _HTML_ROOT_RE.search(content):
         errors.append("Missing <!DOCTYPE html> or <html> tag")
-    if "<head" not in content:
+    if not _HEAD_RE.search(content):
         errors.append("Missing <head> section")
-    if "<body" not in content:
+    if not _BODY_RE.search(content):
         errors.append("Missing <body> section")
     return errors
 
 
 def check_forbidden_patterns(content: str, file_path: str) -> list[str]:
-    warnings = []
-    for pattern in FORBIDDEN_PATTERNS:
-        if re.search(pattern, content):
-            warnings.append(f"Warning: potentially risky pattern in {file_path}: {pattern}")
-    return warnings
+    seen = set()
+    pos = 0
+    # Step one character past each hit rather than its end, so a long match
+    # (<link ... href="https://") can't hide another pattern inside it
+    while m := _FORBIDDEN_RE.search(content, pos):
+        seen.add(m.lastgroup)
+        pos = m.start() + 1
+    return [
+        f"Warning: potentially risky pattern in {file_path}: {pattern}"
+        for group, pattern in _FORBIDDEN_BY_GROUP.items()
+        if group in seen
+    ]
 
 
 def check_file_references(html_content: str, available_files: set[str]) -> list[str]:
     errors = []
     # Check src and href attributes for local file references
-    refs = re.findall(r'(?:src|href)=["\']([^"\']+)["\']', html_content)
-    for ref in refs:
-        if ref.startswith(("http://", "https://", "data:", "#", "mailto:")):
-            continue
-        # Strip leading ./
-        clean = ref.lstrip("./")
+    for ref in _REFS_RE.findall(html_content):
+        # Strip a leading ./ (only that prefix, not any run of dots and slashes)
+        clean = ref[2:] if ref.startswith("./") else ref
         if clean and clean not in available_files:
             errors.append(f"Referenced file not found: {ref}")
     return errors
 
 
-def validate_build(files: list[dict]) -> BuildResult:
+def _scan_index_html(content: str, available_files: set[str]) -> tuple[list[str], list[str]]:
+    """validate_html + check_file_references + check_forbidden_patterns in one scan."""
+    seen_tags = 0
+    seen_forbidden = set()
+    missing_refs = []
+    pos = 0
+    ref_end = 0
+    while m := _INDEX_SCAN_RE.search(content, pos):
+        group = m.lastgroup
+        # Step one character past every hit, as check_forbidden_patterns does,
+        # so no match (a long <link ...> or a ref value) hides another inside it
+        pos = m.start() + 1
+        if group == "ref":
+            # References themselves don't overlap, matching the findall in
+            # check_file_references
+            if m.start() < ref_end:
+                continue
+            ref_end = m.end()
+            ref = m.group("ref")
+            clean = ref[2:] if ref.startswith("./") else ref
+            if clean and clean not in available_files:
+                missing_refs.append(f"Referenced file not found: {ref}")
+        elif group in _STRUCTURE_BITS:
+            seen_tags |= _STRUCTURE_BITS[group]
+        else:
+            seen_forbidden.add(group)
+
+    errors = [message for bit, message in _STRUCTURE_ERRORS if not seen_tags & bit]
+    errors.extend(missing_refs)
+    warnings = [
+        f"Warning: potentially risky pattern in index.html: {pattern}"
+        for group, pattern in _FORBIDDEN_BY_GROUP.items()
+        if group in seen_forbidden
+    ]
+    return errors, warnings
+
+
+def validate_build(files: Collection[dict]) -> BuildResult:
     errors = []
     warnings = []
-    available = {f["file_path"] for f in files}
-
-    html_found = False
-    for f in files:
-        if f["file_path"] == "index.html":
-            html_found = True
-            errors.extend(validate_html(f["content"]))
-            errors.extend(check_file_references(f["content"], available))
+    # Unpack the dicts once; the scans below only need path and content
+    paths = [f["file_path"] for f in files]
+    contents = [f["content"] for f in files]
+    available = set(paths)
 
-        warnings.extend(check_forbidden_patterns(f["content"], f["file_path"]))
+    for path, content in zip(paths, contents):
+        if path == "index.html":
+            html_errors, html_warnings = _scan_index_html(content, available)
+            errors.extend(html_errors)
+            warnings.extend(html_warnings)
+        else:
+            warnings.extend(check_forbidden_patterns(content, path))
 
-    if not html_found:
+    if "index.html" not in available:
         errors.append("Missing index.html")
 
     return BuildResult(success=len(errors) == 0, errors=errors, warnings=warnings)
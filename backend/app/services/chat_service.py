@@ -1,56 +1,94 @@
 import uuid
+from collections import OrderedDict
 
-from sqlalchemy import select
+from sqlalchemy import insert, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.chat_thread import ChatThread
 from app.models.chat_message import ChatMessage
 
+# project_id -> thread_id; a project's thread never changes until the project
+# is deleted, so entries only need dropping then. LRU by access order.
+_THREAD_CACHE_MAX = 10_000
+_thread_cache: OrderedDict[uuid.UUID, int] = OrderedDict()
 
-async def get_or_create_thread(db: AsyncSession, project_id: uuid.UUID) -> ChatThread:
-    result = await db.execute(
-        select(ChatThread).where(ChatThread.project_id == project_id)
+# Stored role -> role sent to the model; anything unexpected becomes "assistant"
+_AI_ROLES = {"user": "user", "assistant": "assistant", "system": "system"}
+
+
+def invalidate_thread_cache(project_id: uuid.UUID) -> None:
+    """Forget the cached thread id for a project."""
+    _thread_cache.pop(project_id, None)
+
+
+async def get_or_create_thread_id(db: AsyncSession, project_id: uuid.UUID) -> int:
+    """Id of the project's chat thread, creating the thread if needed."""
+    thread_id = _thread_cache.get(project_id)
+    if thread_id is not None:
+        _thread_cache.move_to_end(project_id)
+        return thread_id
+
+    thread_id = await db.scalar(
+        select(ChatThread.id).where(ChatThread.project_id == project_id)
     )
-    thread = result.scalar_one_or_none()
-    if not thread:
-        thread = ChatThread(project_id=project_id)
-        db.add(thread)
-        await db.flush()
-    return thread
+    if thread_id is not None:
+        # Only committed threads are cached; a freshly inserted one could
+        # still be rolled back, so it gets cached on the next lookup
+        _thread_cache[project_id] = thread_id
+        if len(_thread_cache) > _THREAD_CACHE_MAX:
+            _thread_cache.popitem(last=False)
+    else:
+        # ON CONFLICT covers a concurrent request creating it first
+        thread_id = await db.scalar(
+            pg_insert(ChatThread)
+            .values(project_id=project_id)
+            .on_conflict_do_nothing(index_elements=[ChatThread.project_id])
+            .returning(ChatThread.id)
+        )
+        if thread_id is None:
+            thread_id = await db.scalar(
+                select(ChatThread.id).where(ChatThread.project_id == project_id)
+            )
+    return thread_id
 
 
 async def add_message(db: AsyncSession, thread_id: int, role: str, content: str) -> ChatMessage:
-    msg = ChatMessage(thread_id=thread_id, role=role, content=content)
-    db.add(msg)
+    # RETURNING hands back id/created_at, so no refresh SELECT after commit
+    result = await db.scalars(
+        insert(ChatMessage).returning(ChatMessage),
+        [{"thread_id": thread_id, "role": role, "content": content}],
+    )
+    msg = result.one()
     await db.commit()
-    await db.refresh(msg)
     return msg
 
 
 async def get_messages(db: AsyncSession, project_id: uuid.UUID) -> list[ChatMessage]:
-    result = await db.execute(
-        select(ChatThread).where(ChatThread.project_id == project_id)
-    )
-    thread = result.scalar_one_or_none()
-    if not thread:
-        return []
+    # One round-trip; a project without a thread simply joins to no rows
     result = await db.execute(
         select(ChatMessage)
-        .where(ChatMessage.thread_id == thread.id)
+        .join(ChatThread, ChatThread.id == ChatMessage.thread_id)
+        .where(ChatThread.project_id == project_id)
         .order_by(ChatMessage.created_at)
     )
     return list(result.scalars().all())
 
 
-async def get_thread_messages_for_ai(db: AsyncSession, thread_id: int) -> list[dict]:
-    """Get messages formatted for OpenAI API."""
+async def get_thread_messages_for_ai(db: AsyncSession, thread_id: int, limit: int = 10) -> list[dict]:
+    """Get the last `limit` messages, oldest first, formatted for OpenAI API.
+
+    The pipeline never sends more than the last 10 messages, so older ones
+    aren't loaded at all (walks ix_chat_messages_thread_created backwards).
+    """
     result = await db.execute(
-        select(ChatMessage)
+        select(ChatMessage.role, ChatMessage.content)
         .where(ChatMessage.thread_id == thread_id)
-        .order_by(ChatMessage.created_at)
+        .order_by(ChatMessage.created_at.desc())
+        .limit(limit)
     )
-    messages = result.scalars().all()
+    rows = result.all()
     return [
-        {"role": msg.role if msg.role in ("user", "assistant", "system") else "assistant", "content": msg.content}
-        for msg in messages
+        {"role": _AI_ROLES.get(role, "assistant"), "content": content}
+        for role, content in reversed(rows)
     ]
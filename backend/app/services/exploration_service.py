@@ -1,30 +1,49 @@
+import asyncio
+import hashlib
 import json
+import re
 import time
 import uuid
-from collections import deque
+from collections import OrderedDict, deque
 from datetime import datetime, timedelta, timezone
 from typing import Any
 
+import orjson
 from openai import AsyncOpenAI
-from sqlalchemy import select
+from sqlalchemy import select, delete, func, or_, cast
+from sqlalchemy.dialects.postgresql import REGCONFIG, insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import undefer
 
 from app.config import settings
+from app.db.engine import async_session_factory
 from app.pipeline.prompts.game_feel import GAME_FEEL_POLICY
 from app.services.feel_defaults import get_feel_priors, get_feel_priors_by_game_type
 
 # ─── Debug Log ─────────────────────────────────────────────
-# In-memory ring buffer of recent OpenAI calls (max 50)
-_debug_log: deque[dict] = deque(maxlen=50)
+# In-memory ring buffer of recent OpenAI calls (settings.openai_debug_log_size).
+# Entries hold full prompts and responses, so deployments that don't use the
+# debug panel should set the size to 0 and keep nothing.
+_debug_log: deque[dict] = deque(maxlen=settings.openai_debug_log_size)
 from app.models.exploration import (
-    ExplorationSession, ExplorationOption, ExplorationMemoryNote, UserPreference, KVCache
+    ExplorationSession, ExplorationOption, ExplorationMemoryNote, UserPreference, KVCache,
+    OPTION_COMPLEXITIES, OPTION_MOBILE_FITS,
 )
 from app.models.project import Project
 from app.models.project_version import ProjectVersion
 from app.models.project_file import ProjectFile
+from app.services.file_service import new_project_file
 
 
 # ─── Prompts ────────────────────────────────────────────────
+#
+# Each stage's instructions, rules and output schema are a fixed *_SYSTEM
+# string; everything that varies per call goes in the *_USER template. That
+# keeps the long system prefix byte-identical across calls so OpenAI's
+# automatic prompt caching can reuse it.
+
+# GAME_FEEL_POLICY is written with format-escaped braces
+_GAME_FEEL_POLICY_TEXT = GAME_FEEL_POLICY.format()
 
 # Stage A: Requirement Decomposer — user request → implementation dimensions
 STAGE_A_DECOMPOSER_PROMPT = """You are an implementation-oriented requirement decomposer for Phaser web games.
@@ -95,7 +114,7 @@ Rules:
 
 
 # Stage A (contextual): when a game already exists, decompose based on current state
-STAGE_A_CONTEXTUAL_PROMPT = """You are an implementation-oriented requirement decomposer for Phaser web games.
+STAGE_A_CONTEXTUAL_SYSTEM = """You are an implementation-oriented requirement decomposer for Phaser web games.
 
 The user already has an existing game. Given their new request and the current game code,
 decompose the request into SPECIFIC implementation dimensions relevant to this change.
@@ -103,33 +122,27 @@ decompose the request into SPECIFIC implementation dimensions relevant to this c
 Do NOT use generic dimensions like "controls" or "platform" if they are already decided.
 Instead, generate dimensions that capture the ACTUAL design decisions needed for this request.
 
-Current game code:
-{current_code}
-
-Already-decided context:
-{decided_context}
-
 Output JSON only:
 
-{{
+{
   "summary": "one-sentence restatement of what the user wants to change/add",
   "ambiguity_level": "none|low|high",
-  "locked": {{
+  "locked": {
     "description": "things already decided that should NOT change",
     "items": ["controls: touch_tap", "presentation: side_scroller", ...]
-  }},
-  "dimensions": {{
-    "<specific_dimension_name>": {{
+  },
+  "dimensions": {
+    "<specific_dimension_name>": {
       "candidates": ["option_a", "option_b", "option_c"],
       "confidence": "high|med|low",
       "signals": ["quotes or inferences from user text"]
-    }}
-  }},
+    }
+  },
   "hard_constraints": ["things the user explicitly required or excluded"],
   "open_questions": [
-    {{"dimension": "...", "question": "...", "why_it_matters": "..."}}
+    {"dimension": "...", "question": "...", "why_it_matters": "..."}
   ]
-}}
+}
 
 Rules:
 - ONLY include dimensions where GENUINE GAMEPLAY AMBIGUITY exists (2+ plausible candidates
@@ -138,7 +151,7 @@ Rules:
 - Implementation details are NOT dimensions. "physics_implementation", "engine_integration",
   "visual_asset_source", "input_targets" are engineering choices, not design ambiguity.
   Only create dimensions for PLAYER-FACING design decisions.
-- If the request is very specific, you may output ZERO dimensions and an empty "dimensions": {{}}.
+- If the request is very specific, you may output ZERO dimensions and an empty "dimensions": {}.
   There is no minimum or maximum — let the actual ambiguity decide.
 - Include an "ambiguity_level" field: "none" (0 dimensions — request is crystal clear),
   "low" (1-2 minor dimensions), or "high" (3+ dimensions with real design trade-offs).
@@ -157,9 +170,17 @@ Rules:
 - You have access to a search_memory tool that can retrieve past exploration memories, design decisions, and user preferences. Use it if prior decisions or patterns would help decompose the request.
 - Return valid JSON only, no markdown."""
 
+STAGE_A_CONTEXTUAL_USER = """Current game code:
+{current_code}
+
+Already-decided context:
+{decided_context}
+
+User request: {user_input}"""
+
 
 # Stage B: Branch Synthesizer — dimensions → divergent branches
-STAGE_B_BRANCH_PROMPT = """You are a game design director for Phaser web game prototyping.
+STAGE_B_BRANCH_SYSTEM = """You are a game design director for Phaser web game prototyping.
 
 Your job: given decomposed design dimensions, produce gameplay branches.
 The number of branches must match the ACTUAL ambiguity in the request.
@@ -177,37 +198,29 @@ When there ARE multiple branches (2+), each branch must answer:
 "What does the PLAYER DO differently? What makes this branch FEEL different
 moment-to-moment?"
 
-Memory context (user preferences from past explorations):
-{memory_context}
-
-Dimensions JSON:
-{dimensions_json}
-
-{locked_context}
-
 Output JSON only:
-{{
+{
   "branches": [
-    {{
+    {
       "branch_id": "B1",
       "name": "short catchy name",
       "player_fantasy": "what is the player's role/identity in this version",
       "gameplay_hook": "the ONE thing that makes this branch feel different to play (1 sentence)",
       "core_mechanics": ["unique mechanic emphasis for THIS branch, e.g. wall_jump, timed_gates, combo_chains"],
-      "picked": {{
+      "picked": {
         "<dimension_name>": "chosen value"
-      }},
+      },
       "why_this_branch": ["reasons this combination is interesting"],
       "risks": ["what might not work"],
       "what_to_validate": ["key assumptions to test"]
-    }}
+    }
   ]
-}}
+}
 
 Rules:
 - If dimensions is empty (0 dimensions), produce exactly 1 branch. The branch
   should be a faithful, comprehensive spec of the user's request. "picked" can be
-  an empty object {{}}. Do NOT invent artificial choices.
+  an empty object {}. Do NOT invent artificial choices.
 - When there are 2+ branches:
   * Branches must differ in GAMEPLAY MECHANICS and PLAYER EXPERIENCE,
     not just in cosmetic/stylistic dimensions (visual_style, art_direction, etc.).
@@ -235,28 +248,29 @@ Content rules:
 
 Other:
 - Keep scope MVP-friendly: prototypable with Phaser primitives, no external assets.
-- If memory context shows user preferences, make one branch aligned with those preferences.
-- You have access to a search_memory tool. Use it to check what worked or failed before.
+- You have access to a search_memory tool. Use it to recall prior preferences and to check
+  what worked or failed before. If it shows user preferences, make one branch aligned with them.
 - Return valid JSON only, no markdown."""
 
+STAGE_B_BRANCH_USER = """Dimensions JSON:
+{dimensions_json}
+
+{locked_context}
+
+Synthesize branches."""
+
 
 # Stage C: Option Mapper — branches → option cards with game_type
-STAGE_C_MAPPER_PROMPT = """You are an option mapper for Phaser web game prototyping.
+STAGE_C_MAPPER_SYSTEM = """You are an option mapper for Phaser web game prototyping.
 
 Convert each design branch into a concrete option card. Assign a game_type that best
 describes the branch's gameplay archetype. The game code will be generated from scratch
 by the AI (Stage E), so you are NOT limited to pre-built templates.
 
-Branches JSON:
-{branches_json}
-
-Design context (from requirement decomposition):
-{design_context}
-
 Output JSON only:
-{{
+{
   "options": [
-    {{
+    {
       "option_id": "opt_1",
       "branch_id": "B1",
       "title": "display name",
@@ -269,10 +283,10 @@ Output JSON only:
       "mobile_fit": "good|fair|poor",
       "assumptions_to_validate": ["key hypotheses"],
       "is_recommended": false
-    }}
+    }
   ],
   "recommended_option_id": "opt_?"
-}}
+}
 
 Rules:
 - One option per branch (match branch count). If there is only 1 branch, produce 1 option.
@@ -301,91 +315,79 @@ CRITICAL — Differentiation between options (only applies when 2+ options):
 
 - Return valid JSON only, no markdown."""
 
+STAGE_C_MAPPER_USER = """Branches JSON:
+{branches_json}
+
+Design context (from requirement decomposition):
+{design_context}
+
+Map branches to options."""
+
 
 # Stage D: Feel/Control Spec Generator — option spec → micro-spec for game feel
-STAGE_D_FEEL_SPEC_PROMPT = """You are a game feel architect for Phaser 3 prototypes.
+STAGE_D_FEEL_SPEC_SYSTEM = """You are a game feel architect for Phaser 3 prototypes.
 
 Given a game design option, the user's intent, and prior knowledge (game-type
 defaults + user preferences), produce a structured micro-spec that defines
 exactly how the game should FEEL: motion model, input handling, camera behavior,
 boundaries, and visual feedback.
 
-== PRIOR: Game-Type Defaults ({game_type}) ==
-These are the baseline values for this game type. Use them as your starting
-point — deviate only with good reason (and explain in the "notes" fields).
-{game_type_defaults}
-
-== PRIOR: User Feel Profile (cross-project) ==
-This user's preferences learned from past explorations. Respect these unless
-the game design requires otherwise.
-{user_profile}
-
-Game design spec:
-- Title: {title}
-- Core loop: {core_loop}
-- Controls: {controls}
-- Mechanics: {mechanics}
-- Complexity: {complexity}
-- Mobile fit: {mobile_fit}
-
-User's original request: "{user_input}"
-
 Output a single JSON object with these sections (include only sections relevant
 to this game — omit sections that don't apply):
 
-{{
-  "movement_model": {{
+{
+  "movement_model": {
     "type": "accel_drag | direct_velocity | grid_snap | none",
     "accel": 0,
     "max_speed": 0,
     "drag": 0,
     "turn_smoothing": 0.0,
     "notes": "why these values"
-  }},
-  "jump_model": {{
+  },
+  "jump_model": {
     "enabled": true,
     "coyote_time_ms": 0,
     "jump_buffer_ms": 0,
     "jump_velocity": 0,
     "gravity": 0,
     "notes": "why these values"
-  }},
-  "input": {{
+  },
+  "input": {
     "buffer_ms": 100,
     "mobile_scheme": "tap_zones | virtual_buttons | swipe | touch_direct",
     "touch_zone_min_px": 44,
-    "key_map": {{"up": "W/ArrowUp", "down": "S/ArrowDown"}},
+    "key_map": {"up": "W/ArrowUp", "down": "S/ArrowDown"},
     "notes": "why this scheme"
-  }},
-  "camera": {{
+  },
+  "camera": {
     "mode": "follow_player | fixed | pan_zones | none",
     "lerp": 0.1,
     "deadzone": [0, 0],
     "bounds": "world | custom | none",
     "notes": "why this setup"
-  }},
-  "bounds": {{
+  },
+  "bounds": {
     "world_bounds": true,
     "entity_clamp": true,
     "world_size": "screen | extended | infinite_scroll",
     "notes": ""
-  }},
-  "visual_feedback": {{
+  },
+  "visual_feedback": {
     "hit_flash_ms": 0,
     "screen_shake": "none | light | medium | heavy",
     "trail": "none | subtle | strong",
     "score_popup": true,
     "notes": "what feedback reinforces the core loop"
-  }},
-  "tuning": {{
+  },
+  "tuning": {
     "expose_in_debug_hud": true,
     "presets": ["arcade", "floaty", "tight"],
     "default_preset": "arcade"
-  }}
-}}
+  }
+}
 
 Rules:
-- START from the game-type defaults above. Only change values when the design spec or user preferences demand it.
+- START from the game-type defaults given with the design spec. Only change values when the design spec or user preferences demand it.
 - If the user profile shows a style_tendency (tight/floaty/arcade), bias values accordingly:
   - tight: higher drag ratio, shorter buffer windows, lower lerp
   - floaty: lower gravity, lower drag, longer coyote time
@@ -396,18 +398,15 @@ Rules:
 - Values must be realistic Phaser 3 numbers (pixels/sec, ms, 0-1 ratios).
 - Return valid JSON only, no markdown."""
 
+STAGE_D_FEEL_SPEC_USER = """== PRIOR: Game-Type Defaults ({game_type}) ==
+These are the baseline values for this game type. Use them as your starting
+point — deviate only with good reason (and explain in the "notes" fields).
+{game_type_defaults}
 
-# Stage E: Game Generator — option spec + feel spec → complete game from scratch
-_STAGE_E_GENERATOR_TEMPLATE = """You are a Phaser 3 game code generator.
-
-You will receive:
-1. A game design spec describing the target game
-2. A **feel micro-spec** with exact numerical parameters for motion, input, camera, etc.
-
-Your job: generate a COMPLETE, working Phaser 3 game from scratch — a single
-self-contained HTML file with embedded JavaScript.
-
-""" + GAME_FEEL_POLICY + """
+== PRIOR: User Feel Profile (cross-project) ==
+This user's preferences learned from past explorations. Respect these unless
+the game design requires otherwise.
+{user_profile}
 
 Game design spec:
 - Title: {title}
@@ -417,13 +416,25 @@ Game design spec:
 - Complexity: {complexity}
 - Mobile fit: {mobile_fit}
 
-Feel micro-spec (use these EXACT values in your TUNING config):
-{feel_spec}
-
 User's original request: "{user_input}"
 
+Generate the feel micro-spec."""
+
+
+# Stage E: Game Generator — option spec + feel spec → complete game from scratch
+STAGE_E_GENERATOR_SYSTEM = """You are a Phaser 3 game code generator.
+
+You will receive:
+1. A game design spec describing the target game
+2. A **feel micro-spec** with exact numerical parameters for motion, input, camera, etc.
+
+Your job: generate a COMPLETE, working Phaser 3 game from scratch — a single
+self-contained HTML file with embedded JavaScript.
+
+""" + _GAME_FEEL_POLICY_TEXT + """
+
 Rules:
-- Output a JSON object: {{"index.html": "<!DOCTYPE html>..."}}
+- Output a JSON object: {"index.html": "<!DOCTYPE html>..."}
 - Start from scratch — do NOT assume any template code exists.
 - Include `<script src="https://cdn.jsdelivr.net/npm/phaser@3.60.0/dist/phaser.min.js"></script>` in <head>.
 - Create a `const TUNING` object at the top of your game script containing
@@ -446,6 +457,21 @@ Rules:
 - Keep it simple but fun — this is a prototype.
 - Return valid JSON only, no markdown."""
 
+STAGE_E_GENERATOR_USER = """Game design spec:
+- Title: {title}
+- Core loop: {core_loop}
+- Controls: {controls}
+- Mechanics: {mechanics}
+- Complexity: {complexity}
+- Mobile fit: {mobile_fit}
+
+Feel micro-spec (use these EXACT values in your TUNING config):
+{feel_spec}
+
+User's original request: "{user_input}"
+
+Generate the game code."""
+
 
 MEMORY_WRITER_PROMPT = """You are a structured memory writer for game exploration sessions.
 
@@ -486,17 +512,9 @@ Generate a JSON object:
 Return valid JSON only, no markdown."""
 
 
-ITERATE_PROMPT = f"""You are a Phaser game code modifier. Given the current game code, the feel micro-spec, and user's modification request, generate the updated complete file content.
-
-{GAME_FEEL_POLICY}
-
-Feel micro-spec (the authoritative source for game-feel values — TUNING must match):
-{{feel_spec}}
+ITERATE_SYSTEM = f"""You are a Phaser game code modifier. Given the current game code, the feel micro-spec, and user's modification request, generate the updated complete file content.
 
-Current files:
-{{current_files}}
-
-User request: "{{user_input}}"
+{_GAME_FEEL_POLICY_TEXT}
 
 Rules:
 - Minimal changes only — but if existing code violates the Game Feel Policy or the feel micro-spec above, fix those violations alongside the requested change.
@@ -506,56 +524,123 @@ Rules:
 - If the user's request changes game-feel parameters (e.g. "make jumping floatier"), update BOTH the relevant TUNING values AND note what changed.
 - Only modify what the user asked for (plus any game-feel fixes)
 - Return a JSON object mapping file_path to new content:
-{{{{"index.html": "<!DOCTYPE html>..."}}}}
+{{"index.html": "<!DOCTYPE html>..."}}
 
 Return valid JSON only, no markdown."""
 
+ITERATE_USER = """Feel micro-spec (the authoritative source for game-feel values — TUNING must match):
+{feel_spec}
+
+Current files:
+{current_files}
+
+User request: "{user_input}"
+
+Apply the requested change."""
+
 
 # ─── Helpers ────────────────────────────────────────────────
 
+# JSON mode: every exploration prompt asks for a JSON object (and says "JSON",
+# which the API requires for this mode)
+_JSON_RESPONSE = {"type": "json_object"}
+
+# A markdown fence around the whole reply (```json ... ```), closing fence
+# optional. JSON mode shouldn't produce one, but OpenAI-compatible endpoints
+# (openai_base_url) may ignore response_format.
+_JSON_FENCE_RE = re.compile(r"\A```[\w-]*\s*(.*?)\s*(?:```)?\Z", re.DOTALL)
+
+
+def _strip_json_fence(content: str) -> str:
+    content = content.strip()
+    m = _JSON_FENCE_RE.match(content)
+    return m.group(1) if m else content
+
+
+def _loads_json(content: str) -> Any:
+    try:
+        return orjson.loads(content)
+    except orjson.JSONDecodeError:
+        # orjson is stricter than json (NaN, integers over 64 bits)
+        return json.loads(content)
+
+
+def _llm_cache_key(system: str, user: str, max_tokens: int) -> str:
+    payload = json.dumps([settings.openai_model, system, user, max_tokens])
+    return "llm:" + hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
 async def _call_openai_json(
-    client: AsyncOpenAI, system: str, user: str, label: str = "", max_tokens: int = 4000
+    client: AsyncOpenAI,
+    system: str,
+    user: str,
+    label: str = "",
+    max_tokens: int = 4000,
+    db: AsyncSession | None = None,
+    stream: bool = False,
 ) -> Any:
-    """Call OpenAI and parse JSON response. Logs to debug buffer."""
+    """Call OpenAI and parse JSON response. Logs to debug buffer.
+
+    When db is given (and settings.llm_cache_enabled), an identical earlier
+    prompt is answered from KVCache; new answers are written in the caller's
+    transaction.
+
+    stream=True is for long code outputs: the completion is read as it is
+    generated, so the client's read timeout applies between chunks rather
+    than to the whole generation.
+    """
+    cache_key = None
+    if db is not None and settings.llm_cache_enabled:
+        cache_key = _llm_cache_key(system, user, max_tokens)
     t0 = time.time()
+    messages = [
+        {"role": "system", "content": system},
+        {"role": "user", "content": user},
+    ]
     entry: dict = {
         "label": label,
         "timestamp": t0,
         "model": settings.openai_model,
-        "messages": [
-            {"role": "system", "content": system},
-            {"role": "user", "content": user},
-        ],
+        "messages": messages,
         "raw_response": None,
         "parsed": None,
         "error": None,
         "duration_ms": 0,
     }
     try:
-        response = await client.chat.completions.create(
-            model=settings.openai_model,
-            messages=[
-                {"role": "system", "content": system},
-                {"role": "user", "content": user},
-            ],
-            temperature=0.7,
-            **settings.max_tokens_param(max_tokens),
-        )
-        content = response.choices[0].message.content or "{}"
+        if cache_key is not None:
+            cached = await get_cached_preview(db, cache_key)
+            if cached is not None:
+                entry["cache_hit"] = True
+                entry["raw_response"] = cached
+                parsed = _loads_json(cached)
+                entry["parsed"] = parsed
+                return parsed
+        if stream:
+            content, usage = await _stream_completion(client, messages, max_tokens)
+        else:
+            response = await client.chat.completions.create(
+                model=settings.openai_model,
+                messages=messages,
+                temperature=0.7,
+                response_format=_JSON_RESPONSE,
+                **settings.max_tokens_param(max_tokens),
+            )
+            content = response.choices[0].message.content or "{}"
+            usage = response.usage
         entry["raw_response"] = content
         entry["usage"] = {
-            "prompt_tokens": response.usage.prompt_tokens if response.usage else 0,
-            "completion_tokens": response.usage.completion_tokens if response.usage else 0,
-            "total_tokens": response.usage.total_tokens if response.usage else 0,
+            "prompt_tokens": usage.prompt_tokens if usage else 0,
+            "completion_tokens": usage.completion_tokens if usage else 0,
+            "total_tokens": usage.total_tokens if usage else 0,
         }
-        content = content.strip()
-        if content.startswith("```"):
-            content = content.split("\n", 1)[1] if "\n" in content else content[3:]
-            if content.endswith("```"):
-                content = content[:-3]
-            content = content.strip()
-        parsed = json.loads(content)
+        content = _strip_json_fence(content)
+        parsed = _loads_json(content)
         entry["parsed"] = parsed
+        if cache_key is not None and isinstance(parsed, dict) and parsed:
+            await put_cached_text(
+                db, cache_key, content, timedelta(seconds=settings.llm_cache_ttl), {"label": label}
+            )
         return parsed
     except Exception as e:
         entry["error"] = str(e)
@@ -565,6 +650,30 @@ async def _call_openai_json(
         _debug_log.append(entry)
 
 
+async def _stream_completion(
+    client: AsyncOpenAI, messages: list[dict], max_tokens: int
+) -> tuple[str, Any]:
+    """Stream a chat completion and return (content, usage)."""
+    stream = await client.chat.completions.create(
+        model=settings.openai_model,
+        messages=messages,
+        temperature=0.7,
+        response_format=_JSON_RESPONSE,
+        stream=True,
+        stream_options={"include_usage": True},
+        **settings.max_tokens_param(max_tokens),
+    )
+    parts = []
+    usage = None
+    async for chunk in stream:
+        # The usage chunk comes last, with an empty choices list
+        if chunk.usage is not None:
+            usage = chunk.usage
+        if chunk.choices and chunk.choices[0].delta.content:
+            parts.append(chunk.choices[0].delta.content)
+    return "".join(parts) or "{}", usage
+
+
 def get_debug_log() -> list[dict]:
     """Return all debug log entries."""
     return list(_debug_log)
@@ -575,6 +684,15 @@ def clear_debug_log() -> None:
     _debug_log.clear()
 
 
+def _enum_value(value: Any, allowed: tuple[str, ...], default: str) -> str:
+    """Coerce an LLM-provided label onto one of the enum column's values."""
+    if isinstance(value, str):
+        value = value.strip().lower()
+        if value in allowed:
+            return value
+    return default
+
+
 # ─── Memory Tool for OpenAI Function Calling ──────────────
 
 MEMORY_TOOL_DEF = {
@@ -609,53 +727,99 @@ MEMORY_TOOL_DEF = {
 }
 
 
+# Query words for to_tsquery; anything else (operators, punctuation) is dropped
+_SEARCH_TERM_RE = re.compile(r"[^\W_]+")
+
+
+# (project_id, query terms, filter_type) -> (expires_at, formatted result).
+# A project's entries are dropped whenever this module writes one of its notes
+# or preferences; the short TTL covers writes made by other processes.
+_MEMORY_SEARCH_CACHE_MAX = 256
+_MEMORY_SEARCH_TTL = 60.0
+_memory_search_cache: OrderedDict[tuple, tuple[float, str]] = OrderedDict()
+
+
+def _purge_memory_search_cache(project_id: uuid.UUID) -> None:
+    for key in [k for k in _memory_search_cache if k[0] == project_id]:
+        del _memory_search_cache[key]
+
+
 async def _search_memory_for_tool(
     db: AsyncSession, project_id: uuid.UUID, query: str, filter_type: str = "all"
 ) -> str:
-    """Execute a memory search and return formatted results for the AI."""
-    result = await db.execute(
-        select(ExplorationMemoryNote)
+    """Cached _run_memory_search. The model tends to repeat the same search
+    across stages and tool rounds; a hit skips the DB and returns the exact
+    same text, which also keeps that tool message prompt-cacheable."""
+    key = (project_id, tuple(_SEARCH_TERM_RE.findall(query.lower())), filter_type)
+    hit = _memory_search_cache.get(key)
+    if hit is not None and hit[0] > time.monotonic():
+        _memory_search_cache.move_to_end(key)
+        return hit[1]
+
+    text = await _run_memory_search(db, project_id, query, filter_type)
+    _memory_search_cache[key] = (time.monotonic() + _MEMORY_SEARCH_TTL, text)
+    _memory_search_cache.move_to_end(key)
+    if len(_memory_search_cache) > _MEMORY_SEARCH_CACHE_MAX:
+        _memory_search_cache.popitem(last=False)
+    return text
+
+
+async def _get_preference_json(project_id: uuid.UUID) -> dict | None:
+    # Own short-lived session, so it can run alongside the note queries on
+    # the caller's session (one AsyncSession can't run statements concurrently)
+    async with async_session_factory() as session:
+        return await session.scalar(
+            select(UserPreference.preference_json)
+            .where(UserPreference.project_id == project_id)
+            .order_by(UserPreference.updated_at.desc())
+            .limit(1)
+        )
+
+
+async def _find_memory_notes(
+    db: AsyncSession, project_id: uuid.UUID, query: str, filter_type: str
+) -> list[dict]:
+    """Notes matching any query term (full-text, via search_tsv), newest
+    first; with no match, the most recent notes instead."""
+    notes_query = (
+        select(ExplorationMemoryNote.content_json)
         .where(ExplorationMemoryNote.project_id == project_id)
         .order_by(ExplorationMemoryNote.created_at.desc())
-        .limit(20)
-    )
-    notes = list(result.scalars().all())
-
-    # Also get user preferences
-    result = await db.execute(
-        select(UserPreference)
-        .where(UserPreference.project_id == project_id)
-        .order_by(UserPreference.updated_at.desc())
-        .limit(1)
+        .limit(10)
     )
-    pref = result.scalar_one_or_none()
+    if filter_type != "all":
+        notes_query = notes_query.where(
+            ExplorationMemoryNote.content_json["type"].astext == filter_type
+        )
 
-    query_lower = query.lower()
     matched = []
-    for note in notes:
-        cj = note.content_json
-        if not isinstance(cj, dict):
-            continue
-        # Filter by type if specified
-        if filter_type != "all" and cj.get("type") != filter_type:
-            continue
-        # Simple relevance: check if query terms appear in content
-        note_text = json.dumps(cj).lower()
-        if any(term in note_text for term in query_lower.split()):
-            matched.append(cj)
-        elif not query_lower.strip():
-            matched.append(cj)
-
-    # If no keyword match, return all (up to limit)
+    terms = _SEARCH_TERM_RE.findall(query.lower())
+    if terms:
+        tsquery = func.to_tsquery(cast("english", REGCONFIG), " | ".join(terms))
+        result = await db.execute(
+            notes_query.where(ExplorationMemoryNote.search_tsv.op("@@")(tsquery))
+        )
+        matched = [cj for cj in result.scalars() if isinstance(cj, dict)]
+    # If no keyword match, return the most recent notes
     if not matched:
-        matched = [n.content_json for n in notes[:10] if isinstance(n.content_json, dict)]
-        if filter_type != "all":
-            matched = [m for m in matched if m.get("type") == filter_type]
+        result = await db.execute(notes_query)
+        matched = [cj for cj in result.scalars() if isinstance(cj, dict)]
+    return matched
+
+
+async def _run_memory_search(
+    db: AsyncSession, project_id: uuid.UUID, query: str, filter_type: str = "all"
+) -> str:
+    """Execute a memory search and return formatted results for the AI."""
+    matched, pref_json = await asyncio.gather(
+        _find_memory_notes(db, project_id, query, filter_type),
+        _get_preference_json(project_id),
+    )
 
     # Format results
     parts = []
-    if pref:
-        parts.append(f"User Preferences: {json.dumps(pref.preference_json)}")
+    if pref_json is not None:
+        parts.append(f"User Preferences: {json.dumps(pref_json)}")
 
     for i, m in enumerate(matched[:10]):
         entry = f"\n--- Memory #{i+1}: {m.get('title', 'Untitled')} ---"
@@ -719,6 +883,7 @@ async def _call_openai_with_tools(
             messages=messages,
             tools=[MEMORY_TOOL_DEF],
             temperature=0.7,
+            response_format=_JSON_RESPONSE,
             **settings.max_tokens_param(max_tokens),
         )
         msg = response.choices[0].message
@@ -727,7 +892,19 @@ async def _call_openai_with_tools(
         rounds = 0
         while msg.tool_calls and rounds < 3:
             rounds += 1
-            messages.append(msg)
+            # Only the fields the API needs, not the full SDK message model
+            messages.append({
+                "role": "assistant",
+                "content": msg.content,
+                "tool_calls": [
+                    {
+                        "id": tc.id,
+                        "type": "function",
+                        "function": {"name": tc.function.name, "arguments": tc.function.arguments},
+                    }
+                    for tc in msg.tool_calls
+                ],
+            })
             for tc in msg.tool_calls:
                 entry["tool_calls"].append({
                     "id": tc.id,
@@ -752,6 +929,7 @@ async def _call_openai_with_tools(
                 messages=messages,
                 tools=[MEMORY_TOOL_DEF],
                 temperature=0.7,
+                response_format=_JSON_RESPONSE,
                 **settings.max_tokens_param(max_tokens),
             )
             msg = response.choices[0].message
@@ -763,13 +941,8 @@ async def _call_openai_with_tools(
             "completion_tokens": response.usage.completion_tokens if response.usage else 0,
             "total_tokens": response.usage.total_tokens if response.usage else 0,
         }
-        content = content.strip()
-        if content.startswith("```"):
-            content = content.split("\n", 1)[1] if "\n" in content else content[3:]
-            if content.endswith("```"):
-                content = content[:-3]
-            content = content.strip()
-        parsed = json.loads(content)
+        content = _strip_json_fence(content)
+        parsed = _loads_json(content)
         entry["parsed"] = parsed
         return parsed
     except Exception as e:
@@ -845,12 +1018,13 @@ async def decompose_requirements(
         code_summary = ""
         for fp, content in current_code.items():
             code_summary += f"--- {fp} ---\n{content[:3000]}\n\n"
-        prompt = STAGE_A_CONTEXTUAL_PROMPT.format(
+        user = STAGE_A_CONTEXTUAL_USER.format(
             current_code=code_summary,
             decided_context=decided_context or "No prior decisions recorded.",
+            user_input=user_input,
         )
         return await _call_openai_with_tools(
-            client, db, project_id, prompt, user_input, label="A:decompose(contextual)"
+            client, db, project_id, STAGE_A_CONTEXTUAL_SYSTEM, user, label="A:decompose(contextual)"
         )
     else:
         # Fresh mode: no existing game
@@ -866,11 +1040,12 @@ async def synthesize_branches(
     db: AsyncSession,
     project_id: uuid.UUID,
     dimensions_json: dict,
-    memory_context: dict,
 ) -> list[dict]:
     """Stage B: Combine dimensions into 3-6 divergent branches.
 
-    Uses _call_openai_with_tools so the model can search_memory for strategy paths.
+    Uses _call_openai_with_tools so the model can search_memory for strategy paths
+    and past preferences; memory is recalled through the tool rather than
+    inlined, so the prompt doesn't change with every new memory note.
     """
     # Extract locked context if present (from contextual decomposer)
     locked = dimensions_json.get("locked")
@@ -884,13 +1059,12 @@ async def synthesize_branches(
     # Pass only the dimensions part to the branch synthesizer
     dims = dimensions_json.get("dimensions", dimensions_json)
 
-    prompt = STAGE_B_BRANCH_PROMPT.format(
-        memory_context=json.dumps(memory_context, indent=2),
+    user = STAGE_B_BRANCH_USER.format(
         dimensions_json=json.dumps(dims, indent=2),
         locked_context=locked_context,
     )
     result = await _call_openai_with_tools(
-        client, db, project_id, prompt, "Synthesize branches", label="B:branches"
+        client, db, project_id, STAGE_B_BRANCH_SYSTEM, user, label="B:branches"
     )
     if isinstance(result, dict) and "branches" in result:
         return result["branches"]
@@ -918,11 +1092,11 @@ async def map_options(
             design_ctx_parts.append(f"Locked decisions: {json.dumps(decomposition['locked'])}")
     design_context = "\n".join(design_ctx_parts) if design_ctx_parts else "No additional context."
 
-    prompt = STAGE_C_MAPPER_PROMPT.format(
+    user = STAGE_C_MAPPER_USER.format(
         branches_json=json.dumps(branches, indent=2),
         design_context=design_context,
     )
-    result = await _call_openai_json(client, prompt, "Map branches to options", label="C:mapper")
+    result = await _call_openai_json(client, STAGE_C_MAPPER_SYSTEM, user, label="C:mapper")
     options = []
     recommended_id = None
     if isinstance(result, dict):
@@ -951,7 +1125,7 @@ async def generate_feel_spec(
     Loads game-type defaults + user feel profile as priors before generation.
     """
     priors = await get_feel_priors_by_game_type(db, game_type)
-    prompt = STAGE_D_FEEL_SPEC_PROMPT.format(
+    user = STAGE_D_FEEL_SPEC_USER.format(
         game_type=priors["game_type"],
         game_type_defaults=json.dumps(priors["game_type_defaults"], indent=2),
         user_profile=json.dumps(priors["user_profile"], indent=2),
@@ -964,7 +1138,7 @@ async def generate_feel_spec(
         user_input=user_input,
     )
     result = await _call_openai_json(
-        client, prompt, "Generate feel micro-spec", label="D:feel_spec"
+        client, STAGE_D_FEEL_SPEC_SYSTEM, user, label="D:feel_spec", db=db
     )
     if isinstance(result, dict):
         return result
@@ -978,9 +1152,14 @@ async def generate_game(
     option: dict,
     user_input: str,
     feel_spec: dict,
+    db: AsyncSession | None = None,
 ) -> dict[str, str]:
-    """Stage E: Generate complete Phaser game from scratch."""
-    prompt = _STAGE_E_GENERATOR_TEMPLATE.format(
+    """Stage E: Generate complete Phaser game from scratch.
+
+    With db, a game already generated for the same spec (e.g. by the preview
+    of the option now being selected) is reused from the response cache.
+    """
+    user = STAGE_E_GENERATOR_USER.format(
         title=option.get("title", ""),
         core_loop=option.get("core_loop", ""),
         controls=option.get("controls", ""),
@@ -991,7 +1170,8 @@ async def generate_game(
         feel_spec=json.dumps(feel_spec, indent=2),
     )
     result = await _call_openai_json(
-        client, prompt, "Generate game code", label="E:generate", max_tokens=12000
+        client, STAGE_E_GENERATOR_SYSTEM, user, label="E:generate", max_tokens=12000, db=db,
+        stream=True,
     )
     if isinstance(result, dict):
         return result
@@ -1010,7 +1190,9 @@ async def _get_current_game_context(
         return None, None
 
     result = await db.execute(
-        select(ProjectFile).where(ProjectFile.version_id == project.current_version_id)
+        select(ProjectFile)
+        .where(ProjectFile.version_id == project.current_version_id)
+        .options(undefer(ProjectFile.content))
     )
     files = list(result.scalars().all())
     if not files:
@@ -1073,7 +1255,8 @@ async def explore(
         decided_context=decided_context,
     )
 
-    # Memory retrieval
+    # Memory retrieval (reported back to the client as memory_influence;
+    # Stage B recalls memory through its search_memory tool instead)
     memory_ctx = await get_memory_context(db, project_id)
 
     # Fast path: if no real ambiguity, skip Stage B — synthesize a single branch inline
@@ -1093,7 +1276,7 @@ async def explore(
         }]
     else:
         # Stage B: synthesize divergent branches
-        branches = await synthesize_branches(client, db, project_id, decomposition, memory_ctx)
+        branches = await synthesize_branches(client, db, project_id, decomposition)
 
     # Stage C
     options, recommended_id = await map_options(client, branches, decomposition)
@@ -1120,8 +1303,8 @@ async def explore(
             controls=opt.get("controls", ""),
             mechanics=opt.get("mechanics", []),
             template_id=game_type,
-            complexity=opt.get("complexity", "medium"),
-            mobile_fit=opt.get("mobile_fit", "good"),
+            complexity=_enum_value(opt.get("complexity"), OPTION_COMPLEXITIES, "medium"),
+            mobile_fit=_enum_value(opt.get("mobile_fit"), OPTION_MOBILE_FITS, "good"),
             assumptions_to_validate=opt.get("assumptions_to_validate", []),
             is_recommended=opt.get("is_recommended", False),
         )
@@ -1152,7 +1335,7 @@ async def select_option(
     session_id: int,
     option_id: str,
 ) -> dict:
-    """Select an option: generate game from scratch with AI, create version, transition state."""
+    """Select an option: use the previewed game (or generate one), create version, transition state."""
     result = await db.execute(
         select(ExplorationSession).where(ExplorationSession.id == session_id)
     )
@@ -1185,10 +1368,15 @@ async def select_option(
 
     feel_spec = await generate_feel_spec(client, db, option_spec, session.user_input, game_type)
 
-    # Stage E: Generate complete game from scratch
-    generated = await generate_game(
-        client, option_spec, session.user_input, feel_spec
-    )
+    # Stage E: reuse the previewed game if there is one, so any fixes made
+    # through fix_preview carry over; otherwise generate it from scratch
+    previewed = await get_cached_preview(db, f"preview:{session_id}:{option_id}")
+    if previewed is not None:
+        generated = {"index.html": _strip_error_catcher(previewed)}
+    else:
+        generated = await generate_game(
+            client, option_spec, session.user_input, feel_spec, db=db
+        )
 
     version = ProjectVersion(
         project_id=project_id,
@@ -1200,12 +1388,7 @@ async def select_option(
     # Create project files from generated output
     html = generated.get("index.html", "")
     if html:
-        pf = ProjectFile(
-            version_id=version.id,
-            file_path="index.html",
-            content=html,
-            file_type="text/html",
-        )
+        pf = new_project_file(version.id, "index.html", html, "text/html")
         db.add(pf)
 
     result = await db.execute(select(Project).where(Project.id == project_id))
@@ -1297,6 +1480,7 @@ async def select_option(
     db.add(note)
 
     await db.commit()
+    _purge_memory_search_cache(project_id)
 
     return {
         "session_id": session.id,
@@ -1329,7 +1513,9 @@ async def iterate(
         raise ValueError("No current version")
 
     result = await db.execute(
-        select(ProjectFile).where(ProjectFile.version_id == project.current_version_id)
+        select(ProjectFile)
+        .where(ProjectFile.version_id == project.current_version_id)
+        .options(undefer(ProjectFile.content))
     )
     current_files = list(result.scalars().all())
 
@@ -1341,7 +1527,7 @@ async def iterate(
     ledger = session.hypothesis_ledger or {}
     feel_spec = ledger.get("feel_spec", {})
 
-    prompt = ITERATE_PROMPT.format(
+    user = ITERATE_USER.format(
         current_files=json.dumps(
             {fp: content[:3000] for fp, content in files_context.items()},
             indent=2
@@ -1349,7 +1535,9 @@ async def iterate(
         user_input=user_input,
         feel_spec=json.dumps(feel_spec, indent=2) if feel_spec else "No feel spec available — infer from the TUNING config in the current code.",
     )
-    modifications = await _call_openai_json(client, prompt, user_input, label="iterate", max_tokens=8000)
+    modifications = await _call_openai_json(
+        client, ITERATE_SYSTEM, user, label="iterate", max_tokens=8000, stream=True
+    )
 
     new_version = ProjectVersion(
         project_id=project_id,
@@ -1360,11 +1548,9 @@ async def iterate(
 
     for fp, content in files_context.items():
         new_content = modifications.get(fp, content)
-        pf = ProjectFile(
-            version_id=new_version.id,
-            file_path=fp,
-            content=new_content,
-            file_type="text/html" if fp.endswith(".html") else "application/javascript",
+        pf = new_project_file(
+            new_version.id, fp, new_content,
+            "text/html" if fp.endswith(".html") else "application/javascript",
         )
         db.add(pf)
 
@@ -1407,19 +1593,19 @@ async def finish_exploration(
     selected_option = None
     if session.selected_option_id:
         result = await db.execute(
-            select(ExplorationOption).where(
+            select(
+                ExplorationOption.option_id,
+                ExplorationOption.title,
+                ExplorationOption.core_loop,
+                ExplorationOption.template_id,
+            ).where(
                 ExplorationOption.session_id == session.id,
                 ExplorationOption.option_id == session.selected_option_id,
             )
         )
-        opt = result.scalar_one_or_none()
+        opt = result.mappings().one_or_none()
         if opt:
-            selected_option = {
-                "option_id": opt.option_id,
-                "title": opt.title,
-                "core_loop": opt.core_loop,
-                "template_id": opt.template_id,
-            }
+            selected_option = dict(opt)
 
     result = await db.execute(select(Project).where(Project.id == project_id))
     project = result.scalar_one_or_none()
@@ -1466,6 +1652,7 @@ async def finish_exploration(
     session.state = "stable"
 
     await db.commit()
+    _purge_memory_search_cache(project_id)
     await db.refresh(note)
 
     return {
@@ -1585,17 +1772,78 @@ async def list_memory_notes(
 
 # ─── Preview Option (AI-powered) ──────────────────────────
 
+# Reports runtime errors from the preview iframe back to the parent page
+_ERROR_CATCHER_SCRIPT = """<script>
+(function(){
+  var errors=[];
+  window.onerror=function(msg,url,line,col,err){
+    if(errors.length<5){
+      errors.push({message:String(msg),line:line,col:col,stack:err?err.stack:''});
+      window.parent.postMessage({type:'preview-runtime-error',
+        errors:errors},'*');
+    }
+    return true;
+  };
+})();
+</script>"""
+# Every statement ends in ; or a brace, so joining the lines is a safe minify
+_ERROR_CATCHER_SCRIPT = "".join(line.strip() for line in _ERROR_CATCHER_SCRIPT.splitlines())
+_HEAD_REPLACEMENTS = tuple((tag, tag + _ERROR_CATCHER_SCRIPT) for tag in ("<head>", "<HEAD>"))
+
+
+def _inject_error_catcher(html: str) -> str:
+    """Insert the error catcher right after <head>; done once, before caching."""
+    for needle, replacement in _HEAD_REPLACEMENTS:
+        if needle in html:
+            return html.replace(needle, replacement, 1)
+    return html
+
+
+def _strip_error_catcher(html: str) -> str:
+    """Undo _inject_error_catcher, giving back the game as generated."""
+    return html.replace(_ERROR_CATCHER_SCRIPT, "", 1)
+
+
 async def get_cached_preview(db: AsyncSession, cache_key: str) -> str | None:
-    """Read cached preview HTML from KVCache. Returns None on miss or expiry."""
+    """Read a cached value (preview HTML, LLM response) from KVCache.
+    Returns None on miss or expiry."""
     result = await db.execute(
-        select(KVCache).where(KVCache.cache_key == cache_key)
+        select(KVCache.value_text).where(
+            KVCache.cache_key == cache_key,
+            or_(KVCache.expires_at.is_(None), KVCache.expires_at > func.now()),
+        )
     )
-    row = result.scalar_one_or_none()
-    if not row:
-        return None
-    if row.expires_at and row.expires_at < datetime.now(timezone.utc):
-        return None
-    return row.value_text
+    return result.scalar_one_or_none()
+
+
+async def put_cached_text(
+    db: AsyncSession, cache_key: str, value: str, ttl: timedelta, meta: dict | None = None
+) -> None:
+    """Upsert a KVCache entry in one statement; the caller commits."""
+    stmt = pg_insert(KVCache).values(
+        cache_key=cache_key,
+        value_text=value,
+        meta_json=meta,
+        expires_at=datetime.now(timezone.utc) + ttl,
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[KVCache.cache_key],
+        set_={
+            "value_text": stmt.excluded.value_text,
+            "meta_json": stmt.excluded.meta_json,
+            "expires_at": stmt.excluded.expires_at,
+        },
+    )
+    await db.execute(stmt)
+
+
+async def purge_expired_cache(db: AsyncSession) -> int:
+    """Delete expired KVCache rows. Returns the number of rows removed."""
+    result = await db.execute(
+        delete(KVCache).where(KVCache.expires_at < func.now())
+    )
+    await db.commit()
+    return result.rowcount
 
 
 async def preview_option(
@@ -1654,32 +1902,18 @@ async def preview_option(
 
     # Stage E: generate complete game from scratch
     generated = await generate_game(
-        client, option_spec, session.user_input, feel_spec
+        client, option_spec, session.user_input, feel_spec, db=db
     )
 
     html = generated.get("index.html", "")
     if not html:
         raise ValueError("Game generation failed — no index.html produced")
+    html = _inject_error_catcher(html)
 
-    # Upsert into KVCache
-    expires = datetime.now(timezone.utc) + timedelta(minutes=30)
-    existing = await db.execute(
-        select(KVCache).where(KVCache.cache_key == cache_key)
+    await put_cached_text(
+        db, cache_key, html, timedelta(minutes=30),
+        {"session_id": session_id, "option_id": option_id},
     )
-    row = existing.scalar_one_or_none()
-    if row:
-        row.value_text = html
-        row.expires_at = expires
-        row.meta_json = {"session_id": session_id, "option_id": option_id}
-    else:
-        row = KVCache(
-            cache_key=cache_key,
-            value_text=html,
-            meta_json={"session_id": session_id, "option_id": option_id},
-            expires_at=expires,
-        )
-        db.add(row)
-
     await db.commit()
     return html
 
@@ -1737,7 +1971,8 @@ async def fix_preview(
     if attempts >= 2:
         raise ValueError("Max fix attempts reached")
 
-    current_code = row.value_text
+    # The model sees the game as generated, without our injected catcher
+    current_code = _strip_error_catcher(row.value_text)
 
     # Format errors for prompt
     error_lines = []
@@ -1757,12 +1992,13 @@ async def fix_preview(
 
     fixed = await _call_openai_json(
         client, prompt, "Fix the runtime errors",
-        label="fix_preview", max_tokens=8000
+        label="fix_preview", max_tokens=8000, stream=True
     )
 
     html = fixed.get("index.html", "")
     if not html:
         raise ValueError("AI did not return fixed code")
+    html = _inject_error_catcher(html)
 
     # Update cache
     row.value_text = html
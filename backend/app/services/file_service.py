@@ -1,34 +1,117 @@
+import hashlib
 import uuid
 
-from sqlalchemy import select
+from sqlalchemy import LargeBinary, Row, null, select, type_coerce
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.project import Project
 from app.models.project_file import ProjectFile
+from app.utils.llm import estimate_tokens
 
 
-async def get_current_files(db: AsyncSession, project_id: uuid.UUID) -> list[ProjectFile]:
-    project = await db.get(Project, project_id)
-    if not project or not project.current_version_id:
-        return []
+def new_project_file(
+    version_id: int, file_path: str, content: str, file_type: str = "text/plain"
+) -> ProjectFile:
+    """Build a ProjectFile with its content hash and token count filled in."""
+    return ProjectFile(
+        version_id=version_id,
+        file_path=file_path,
+        content=content,
+        file_type=file_type,
+        content_sha256=hashlib.sha256(content.encode("utf-8")).hexdigest(),
+        token_count=estimate_tokens(content),
+    )
+
+
+# Pipeline view of a stored file, carrying the cached hash and token count.
+# Selected as plain columns so no ORM instances are built just to be copied.
+_FILE_DICT_COLUMNS = (
+    ProjectFile.file_path,
+    ProjectFile.content,
+    ProjectFile.file_type,
+    ProjectFile.content_sha256,
+    ProjectFile.token_count,
+)
+
+
+async def get_current_file_dicts(db: AsyncSession, project_id: uuid.UUID) -> list[dict]:
+    """Current version's files as pipeline dicts, in one query."""
     result = await db.execute(
-        select(ProjectFile).where(ProjectFile.version_id == project.current_version_id)
+        select(*_FILE_DICT_COLUMNS)
+        .join(Project, Project.current_version_id == ProjectFile.version_id)
+        .where(Project.id == project_id)
     )
-    return list(result.scalars().all())
+    return [dict(row) for row in result.mappings()]
 
 
-async def get_file_by_path(db: AsyncSession, version_id: int, file_path: str) -> ProjectFile | None:
+async def get_current_file_listing(db: AsyncSession, project_id: uuid.UUID) -> list[dict]:
+    """Current version's files shaped like ProjectFileResponse, ready to
+    serialize as-is (the rows are our own, so no response validation)."""
     result = await db.execute(
-        select(ProjectFile).where(
-            ProjectFile.version_id == version_id,
-            ProjectFile.file_path == file_path,
+        select(
+            ProjectFile.id,
+            ProjectFile.version_id,
+            ProjectFile.file_path,
+            ProjectFile.content,
+            ProjectFile.file_type,
         )
+        .join(Project, Project.current_version_id == ProjectFile.version_id)
+        .where(Project.id == project_id)
     )
-    return result.scalar_one_or_none()
+    return [dict(row) for row in result.mappings()]
 
 
-async def get_version_files(db: AsyncSession, version_id: int) -> list[ProjectFile]:
+async def get_version_file_dicts(db: AsyncSession, version_id: int) -> list[dict]:
     result = await db.execute(
-        select(ProjectFile).where(ProjectFile.version_id == version_id)
+        select(*_FILE_DICT_COLUMNS).where(ProjectFile.version_id == version_id)
+    )
+    return [dict(row) for row in result.mappings()]
+
+
+# Stored bytes as-is (possibly zstd-compressed), skipping CompressedText's
+# decode so served files can be streamed with iter_stored_bytes()
+_RAW_CONTENT = type_coerce(ProjectFile.content, LargeBinary)
+
+
+async def _get_project_file(
+    db: AsyncSession, version_column, project_id: uuid.UUID, file_path: str, with_content: bool
+) -> Row | None:
+    stmt = (
+        select(
+            ProjectFile.id,
+            ProjectFile.content_sha256,
+            (_RAW_CONTENT if with_content else null()).label("raw_content"),
+        )
+        .join(Project, version_column == ProjectFile.version_id)
+        .where(Project.id == project_id, ProjectFile.file_path == file_path)
+    )
+    result = await db.execute(stmt)
+    return result.one_or_none()
+
+
+async def get_current_file(
+    db: AsyncSession, project_id: uuid.UUID, file_path: str, with_content: bool = True
+) -> Row | None:
+    """(id, content_sha256, raw_content) of a file in the project's current
+    version, resolved in a single query.
+
+    raw_content is the stored bytes, None when with_content=False; fetch it
+    later with get_raw_content().
+    """
+    return await _get_project_file(
+        db, Project.current_version_id, project_id, file_path, with_content
     )
-    return list(result.scalars().all())
+
+
+async def get_published_file(
+    db: AsyncSession, project_id: uuid.UUID, file_path: str, with_content: bool = True
+) -> Row | None:
+    """Same as get_current_file, for the project's published version."""
+    return await _get_project_file(
+        db, Project.published_version_id, project_id, file_path, with_content
+    )
+
+
+async def get_raw_content(db: AsyncSession, file_id: int) -> bytes:
+    result = await db.execute(select(_RAW_CONTENT).where(ProjectFile.id == file_id))
+    return result.scalar_one()
@@ -1,5 +1,6 @@
 import json
 import uuid
+from collections.abc import Iterable
 
 from openai import AsyncOpenAI
 from sqlalchemy import select, delete, text
@@ -18,6 +19,15 @@ async def generate_embedding(client: AsyncOpenAI, content: str) -> list[float]:
     return response.data[0].embedding
 
 
+async def generate_embeddings(client: AsyncOpenAI, contents: list[str]) -> list[list[float]]:
+    """Generate embeddings for several texts in a single API call."""
+    response = await client.embeddings.create(
+        model=settings.openai_embedding_model,
+        input=[c[:8000] for c in contents],
+    )
+    return [d.embedding for d in sorted(response.data, key=lambda d: d.index)]
+
+
 async def create_memory(
     db: AsyncSession,
     client: AsyncOpenAI,
@@ -38,6 +48,26 @@ async def create_memory(
     return memory
 
 
+async def create_memories(
+    db: AsyncSession,
+    client: AsyncOpenAI,
+    project_id: uuid.UUID,
+    contents: list[str],
+    source: str = "manual",
+) -> list[ProjectMemory]:
+    """Create several memories with one embeddings request and one commit."""
+    if not contents:
+        return []
+    embeddings = await generate_embeddings(client, contents)
+    memories = [
+        ProjectMemory(project_id=project_id, content=content, embedding=embedding, source=source)
+        for content, embedding in zip(contents, embeddings)
+    ]
+    db.add_all(memories)
+    await db.commit()
+    return memories
+
+
 async def update_memory(
     db: AsyncSession,
     client: AsyncOpenAI,
@@ -92,13 +122,18 @@ async def search_memories(
 ) -> list[ProjectMemory]:
     """Semantic search using pgvector cosine similarity."""
     query_embedding = await generate_embedding(client, query)
+    # Scoped to the current transaction, so pooled connections keep the default
+    await db.execute(
+        text("SELECT set_config('hnsw.ef_search', :ef_search, true)"),
+        {"ef_search": str(settings.memory_hnsw_ef_search)},
+    )
     # Use raw SQL for pgvector cosine distance operator
     result = await db.execute(
         text(
             "SELECT id, project_id, content, source, created_at, updated_at "
             "FROM project_memories "
             "WHERE project_id = :project_id AND embedding IS NOT NULL "
-            "ORDER BY embedding <=> :embedding "
+            "ORDER BY embedding <=> CAST(:embedding AS halfvec(1536)) "
             "LIMIT :limit"
         ),
         {"project_id": project_id, "embedding": str(query_embedding), "limit": limit},
@@ -177,7 +212,7 @@ async def extract_memories_from_conversation(
     client: AsyncOpenAI,
     message: str,
     history: list[dict],
-    current_files: list[dict],
+    current_files: Iterable[dict],
 ) -> list[str]:
     """Use AI to extract memorable facts from a conversation."""
     file_list = ", ".join(f["file_path"] for f in current_files)
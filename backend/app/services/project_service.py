@@ -9,6 +9,9 @@ from app.models.project_file import ProjectFile
 from app.models.chat_thread import ChatThread
 from app.models.chat_message import ChatMessage
 from app.models.project_memory import ProjectMemory
+from app.pipeline.intent_parser import purge_intent_cache
+from app.services.chat_service import invalidate_thread_cache
+from app.services.file_service import new_project_file
 from app.schemas.project import ProjectCreate, ProjectUpdate
 from app.templates.init_project import DEFAULT_FILES
 
@@ -24,11 +27,8 @@ async def create_project(db: AsyncSession, data: ProjectCreate) -> Project:
     await db.flush()
 
     for file_data in DEFAULT_FILES:
-        db.add(ProjectFile(
-            version_id=version.id,
-            file_path=file_data["file_path"],
-            content=file_data["content"],
-            file_type=file_data["file_type"],
+        db.add(new_project_file(
+            version.id, file_data["file_path"], file_data["content"], file_data["file_type"]
         ))
 
     project.current_version_id = version.id
@@ -93,4 +93,6 @@ async def delete_project(db: AsyncSession, project_id: uuid.UUID) -> bool:
     # 7. Delete project
     await db.execute(delete(Project).where(Project.id == project_id))
     await db.commit()
+    purge_intent_cache(project_id)
+    invalidate_thread_cache(project_id)
     return True
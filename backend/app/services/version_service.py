@@ -1,11 +1,12 @@
 import uuid
+from collections.abc import Iterable
 
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.project import Project
 from app.models.project_version import ProjectVersion
-from app.models.project_file import ProjectFile
+from app.services.file_service import get_version_file_dicts, new_project_file
 
 
 async def list_versions(db: AsyncSession, project_id: uuid.UUID) -> list[ProjectVersion]:
@@ -20,7 +21,7 @@ async def list_versions(db: AsyncSession, project_id: uuid.UUID) -> list[Project
 async def create_version(
     db: AsyncSession,
     project_id: uuid.UUID,
-    files: list[dict],
+    files: Iterable[dict],
     source_message_id: int | None = None,
     build_status: str = "success",
     build_log: str | None = None,
@@ -35,11 +36,8 @@ async def create_version(
     await db.flush()
 
     for f in files:
-        db.add(ProjectFile(
-            version_id=version.id,
-            file_path=f["file_path"],
-            content=f["content"],
-            file_type=f.get("file_type", "text/plain"),
+        db.add(new_project_file(
+            version.id, f["file_path"], f["content"], f.get("file_type", "text/plain")
         ))
 
     # Update project's current version
@@ -58,12 +56,6 @@ async def rollback_to_version(db: AsyncSession, project_id: uuid.UUID, version_i
         return None
 
     # Copy files from source version into a new version
-    files = []
-    for f in source_version.files:
-        files.append({
-            "file_path": f.file_path,
-            "content": f.content,
-            "file_type": f.file_type,
-        })
+    files = await get_version_file_dicts(db, version_id)
 
     return await create_version(db, project_id, files, build_status="success", build_log="Rollback from version " + str(version_id))
@@ -0,0 +1,146 @@
+import asyncio
+import logging
+import re
+import time
+from typing import Any
+
+import httpx
+
+logger = logging.getLogger("app.llm")
+
+
+def log_usage(label: str, response: Any) -> None:
+    """Log prompt/completion token usage, including prompt-cache hits.
+
+    OpenAI caches prompt prefixes automatically once they pass 1024 tokens;
+    `cached_tokens` shows how much of the prompt was served from that cache.
+    """
+    usage = getattr(response, "usage", None)
+    if usage is None:
+        return
+    details = getattr(usage, "prompt_tokens_details", None)
+    cached = getattr(details, "cached_tokens", 0) or 0
+    logger.info(
+        "%s: prompt=%s cached=%s completion=%s",
+        label, usage.prompt_tokens, cached, usage.completion_tokens,
+    )
+
+
+def cache_routing(cache_key: str | None, label: str) -> dict:
+    """prompt_cache_key kwarg for a project's calls to one pipeline stage.
+
+    Requests sharing a key are routed to the same prompt cache, so a
+    project's stable prefix (system prompt, files, history) stays warm
+    across turns instead of competing with every other project.
+    """
+    if not cache_key:
+        return {}
+    return {"prompt_cache_key": f"{cache_key}:{label}"}
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 chars per token), good enough for budgeting prompts."""
+    return (len(text) + 3) // 4
+
+
+class _TokenBucket:
+    """Per-minute budget that refills continuously; acquire() waits for capacity."""
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.tokens = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self, amount: float) -> None:
+        amount = min(amount, self.capacity)
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+
+
+# Completion cap in a serialized chat request; quotes inside prompt strings are
+# escaped, so this can only hit the top-level parameter
+_MAX_TOKENS_RE = re.compile(rb'"max(?:_completion)?_tokens"\s*:\s*(\d+)')
+
+
+def _request_token_cost(body: bytes) -> int:
+    """Tokens a request counts against TPM: prompt estimate + completion cap.
+
+    OpenAI's limiter charges max_tokens up front, so pacing on the prompt
+    alone lets large-output calls (12k-token game generation) overrun TPM.
+    """
+    cost = len(body) // 4
+    m = _MAX_TOKENS_RE.search(body)
+    if m:
+        cost += int(m.group(1))
+    return cost
+
+
+class _ReleasingStream(httpx.AsyncByteStream):
+    """Response body that frees the concurrency slot once it is closed."""
+
+    def __init__(self, stream: httpx.AsyncByteStream, release):
+        self._stream = stream
+        self._release = release
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self) -> None:
+        try:
+            await self._stream.aclose()
+        finally:
+            self._release()
+
+
+class RateLimitedTransport(httpx.AsyncBaseTransport):
+    """httpx transport that paces OpenAI requests before they are sent.
+
+    Caps in-flight requests (a streamed completion holds its slot until the
+    body is closed) and spends requests/tokens from per-minute buckets, so
+    bursts queue locally instead of coming back as 429s. A request's token
+    cost is request bytes / 4 plus its max_tokens cap. Retries with backoff are left to the
+    OpenAI client's own max_retries.
+    """
+
+    def __init__(
+        self,
+        transport: httpx.AsyncBaseTransport,
+        max_concurrent: int,
+        rpm: int = 0,
+        tpm: int = 0,
+    ):
+        self._transport = transport
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self._rpm = _TokenBucket(rpm) if rpm > 0 else None
+        self._tpm = _TokenBucket(tpm) if tpm > 0 else None
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        await self._semaphore.acquire()
+        try:
+            if self._rpm:
+                await self._rpm.acquire(1)
+            if self._tpm:
+                await self._tpm.acquire(_request_token_cost(request.content))
+            response = await self._transport.handle_async_request(request)
+        except BaseException:
+            self._semaphore.release()
+            raise
+        return httpx.Response(
+            status_code=response.status_code,
+            headers=response.headers,
+            stream=_ReleasingStream(response.stream, self._semaphore.release),
+            extensions=response.extensions,
+        )
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
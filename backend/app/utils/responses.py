@@ -0,0 +1,61 @@
+from collections.abc import Iterable
+from typing import Any
+
+from fastapi import Request
+from fastapi.responses import Response, StreamingResponse
+from pydantic import TypeAdapter
+from sqlalchemy import Row
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.types import is_zstd, iter_stored_bytes
+from app.services.file_service import get_raw_content
+from app.utils.sandbox import SANDBOX_CSP, accepts_zstd, etag_matches, file_etag, get_mime_type
+
+
+class ListResponder:
+    """Serializes a list endpoint's rows in one pydantic-core pass.
+
+    Returning a Response skips FastAPI's own response_model validation and
+    jsonable_encoder walk; keep response_model on the route for the schema.
+    """
+
+    def __init__(self, item_type: type):
+        self._adapter = TypeAdapter(list[item_type])
+
+    def __call__(self, rows: Iterable[Any]) -> Response:
+        items = self._adapter.validate_python(list(rows), from_attributes=True)
+        return Response(content=self._adapter.dump_json(items), media_type="application/json")
+
+
+def wants_content(request: Request) -> bool:
+    """Whether to load a served file's content along with its row.
+
+    A conditional request will most likely be answered with a 304, so the
+    content is only loaded up front when the client has nothing cached.
+    """
+    return not request.headers.get("if-none-match")
+
+
+async def stored_file_response(
+    request: Request, file: Row, file_path: str, db: AsyncSession, cache_control: str
+) -> Response:
+    """Serve a project file row from get_current_file/get_published_file:
+    ETag/304, sandbox headers and the stored bytes."""
+    etag = file_etag(file.content_sha256, file.id)
+    headers = {
+        "Content-Security-Policy": SANDBOX_CSP,
+        "ETag": etag,
+        "Vary": "Accept-Encoding",
+        "Cache-Control": cache_control,
+    }
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    raw = file.raw_content if file.raw_content is not None else await get_raw_content(db, file.id)
+    mime = get_mime_type(file_path)
+    # Large files are stored as zstd frames; clients that accept zstd get
+    # them byte for byte, everyone else gets them decompressed as they stream
+    if is_zstd(raw) and accepts_zstd(request.headers.get("accept-encoding")):
+        headers["Content-Encoding"] = "zstd"
+        return Response(content=raw, media_type=mime, headers=headers)
+    return StreamingResponse(iter_stored_bytes(raw), media_type=mime, headers=headers)
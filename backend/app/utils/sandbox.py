@@ -15,9 +15,46 @@ MIME_TYPES = {
     ".txt": "text/plain",
 }
 
+# Values allowed in project_files.file_type (the project_file_type enum)
+FILE_TYPES = tuple(dict.fromkeys(MIME_TYPES.values()))
+
 
 def get_mime_type(file_path: str) -> str:
-    for ext, mime in MIME_TYPES.items():
-        if file_path.endswith(ext):
-            return mime
-    return "text/plain"
+    _, dot, ext = file_path.rpartition(".")
+    if not dot:
+        return "text/plain"
+    return MIME_TYPES.get("." + ext, "text/plain")
+
+
+def file_etag(content_sha256: str | None, file_id: int) -> str:
+    """ETag for a stored file. File rows are never edited in place, so the row
+    id is a safe fallback for rows written before hashes were stored.
+
+    Weak, since the same file may be sent zstd-encoded or as identity.
+    """
+    if content_sha256:
+        return f'W/"{content_sha256}"'
+    return f'W/"file-{file_id}"'
+
+
+def accepts_zstd(accept_encoding: str | None) -> bool:
+    for coding in (accept_encoding or "").split(","):
+        name, _, params = coding.partition(";")
+        if name.strip().lower() != "zstd":
+            continue
+        q = params.strip().removeprefix("q=")
+        try:
+            return float(q) > 0 if q else True
+        except ValueError:
+            return True
+    return False
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison, as If-None-Match requires
+    target = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == target for tag in if_none_match.split(","))
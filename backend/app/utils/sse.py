@@ -1,4 +1,5 @@
 import json
+import time
 from typing import Any
 
 
@@ -29,3 +30,34 @@ def sse_error(message: str) -> str:
 
 def sse_done(version_id: int | None = None) -> str:
     return sse_event("done", {"version_id": version_id})
+
+
+class TokenCoalescer:
+    """Batches streamed tokens into one token event per interval or size limit.
+
+    add() returns an event when the buffer is due; call flush() before sending
+    any other event so ordering is preserved.
+    """
+
+    def __init__(self, interval_ms: int, max_chars: int = 512):
+        self.interval = interval_ms / 1000
+        self.max_chars = max_chars
+        self.parts: list[str] = []
+        self.size = 0
+        self.last_flush = time.monotonic()
+
+    def add(self, token: str) -> str | None:
+        self.parts.append(token)
+        self.size += len(token)
+        if self.size >= self.max_chars or time.monotonic() - self.last_flush >= self.interval:
+            return self.flush()
+        return None
+
+    def flush(self) -> str | None:
+        self.last_flush = time.monotonic()
+        if not self.parts:
+            return None
+        text = "".join(self.parts)
+        self.parts.clear()
+        self.size = 0
+        return sse_token(text)
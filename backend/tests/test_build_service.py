@@ -0,0 +1,55 @@
+import random
+import re
+
+from app.services.build_service import (
+    FORBIDDEN_PATTERNS,
+    _scan_index_html,
+    check_file_references,
+    check_forbidden_patterns,
+    validate_html,
+)
+
+# Fragments that overlap each other's patterns in awkward ways: tags inside
+# attribute values, forbidden calls inside refs, refs inside <link ...>
+_FRAGMENTS = [
+    "<!DOCTYPE html>", "<html>", "<HEAD>", "<head>", "<body>", "<Body ",
+    "<script src=\"https://cdn/x.js\">", "<link rel=x href='https://f'>",
+    "<link ", "src=\"", "href='", "src=", "href=", "\"", "'", "./",
+    "app.js", "style.css", "missing.png", "#top", "data:x", "mailto:a",
+    "javascript:", "fetch(", "fetch (", "require(", "import ", "import",
+    "x", " ", "\n", "(", ")", "<", ">",
+]
+_AVAILABLE = {"index.html", "app.js", "style.css"}
+
+
+def _separate_checks(content: str) -> tuple[list[str], list[str]]:
+    errors = validate_html(content) + check_file_references(content, _AVAILABLE)
+    return errors, check_forbidden_patterns(content, "index.html")
+
+
+def test_fused_scan_matches_separate_checks():
+    rng = random.Random(1234)
+    for _ in range(20000):
+        content = "".join(rng.choices(_FRAGMENTS, k=rng.randint(0, 25)))
+        assert _scan_index_html(content, _AVAILABLE) == _separate_checks(content), content
+
+
+def test_forbidden_pattern_inside_ref_value():
+    content = "<!DOCTYPE html><head></head><body><a href=\"javascript:fetch('/api/score')\"></a></body>"
+    errors, warnings = _scan_index_html(content, _AVAILABLE)
+    assert warnings == [
+        "Warning: potentially risky pattern in index.html: " + r"\bfetch\s*\("
+    ]
+    assert (errors, warnings) == _separate_checks(content)
+
+
+def test_check_forbidden_patterns_matches_per_pattern_search():
+    rng = random.Random(5678)
+    for _ in range(20000):
+        content = "".join(rng.choices(_FRAGMENTS, k=rng.randint(0, 25)))
+        expected = [
+            f"Warning: potentially risky pattern in app.js: {p}"
+            for p in FORBIDDEN_PATTERNS
+            if re.search(p, content)
+        ]
+        assert check_forbidden_patterns(content, "app.js") == expected, content
@@ -4,6 +4,6 @@ set -e
 cd /app/backend
 alembic upgrade head
 
-uvicorn app.main:app --host 127.0.0.1 --port 8000 &
+uvicorn app.main:app --host 127.0.0.1 --port 8000 --loop uvloop --http httptools &
 
 nginx -g 'daemon off;'